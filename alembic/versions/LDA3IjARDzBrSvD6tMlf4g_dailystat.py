@@ -0,0 +1,885 @@
+from alembic import op
+from sqlalchemy.sql.schema import Column, ForeignKeyConstraint, Index, MetaData, PrimaryKeyConstraint, Table
+from sqlalchemy.sql.sqltypes import Boolean, Date, DateTime, Float, Integer
+from sqlmodel.sql.sqltypes import AutoString
+
+# revision identifiers, used by Alembic.
+revision = 'LDA3IjARDzBrSvD6tMlf4g'
+down_revision = 'wyS8uWBPymsbAOSNG_dJ6Q'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    # ### commands auto generated by rewire_sqlmodel - please adjust! ###
+    op.create_table(
+        'dailystat',
+        Column(
+            'day',
+            Date(),
+            primary_key=True,
+            nullable=False,
+        ),
+        Column(
+            'kind',
+            AutoString(),
+            primary_key=True,
+            nullable=False,
+        ),
+        Column(
+            'item_id',
+            Integer(),
+            primary_key=True,
+            nullable=False,
+        ),
+        Column(
+            'total',
+            Integer(),
+            nullable=False,
+        ),
+        PrimaryKeyConstraint(
+            'day',
+            'kind',
+            'item_id',
+        ),
+    )
+    # ### end Alembic commands ###
+
+    op.execute("INSERT INTO dailystat (day, kind, item_id, total) SELECT date(created_at), 'reviews', 0, count(*) FROM review GROUP BY date(created_at)")
+    op.execute("INSERT INTO dailystat (day, kind, item_id, total) SELECT date(created_at), 'complaints', 0, count(*) FROM complaint GROUP BY date(created_at)")
+    op.execute("INSERT INTO dailystat (day, kind, item_id, total) SELECT date(review.created_at), 'doctors', reviewdoctorlink.doctor_id, count(*) FROM reviewdoctorlink JOIN review ON review.id = reviewdoctorlink.review_id GROUP BY date(review.created_at), reviewdoctorlink.doctor_id")
+    op.execute("INSERT INTO dailystat (day, kind, item_id, total) SELECT date(review.created_at), 'services', reviewservicelink.service_id, count(*) FROM reviewservicelink JOIN review ON review.id = reviewservicelink.review_id GROUP BY date(review.created_at), reviewservicelink.service_id")
+    op.execute("INSERT INTO dailystat (day, kind, item_id, total) SELECT date(review.created_at), 'aspects', reviewaspectlink.aspect_id, count(*) FROM reviewaspectlink JOIN review ON review.id = reviewaspectlink.review_id GROUP BY date(review.created_at), reviewaspectlink.aspect_id")
+    op.execute("INSERT INTO dailystat (day, kind, item_id, total) SELECT date(review.created_at), 'sources', reviewsourcelink.source_id, count(*) FROM reviewsourcelink JOIN review ON review.id = reviewsourcelink.review_id GROUP BY date(review.created_at), reviewsourcelink.source_id")
+    op.execute("INSERT INTO dailystat (day, kind, item_id, total) SELECT date(review.created_at), 'rewards', reviewrewardlink.reward_id, count(*) FROM reviewrewardlink JOIN review ON review.id = reviewrewardlink.review_id GROUP BY date(review.created_at), reviewrewardlink.reward_id")
+    op.execute("INSERT INTO dailystat (day, kind, item_id, total) SELECT date(review.created_at), 'platforms', reviewplatformlink.platform_id, count(*) FROM reviewplatformlink JOIN review ON review.id = reviewplatformlink.review_id GROUP BY date(review.created_at), reviewplatformlink.platform_id")
+    op.execute("INSERT INTO dailystat (day, kind, item_id, total) SELECT date(complaint.created_at), 'reasons', complaintreasonlink.reason_id, count(*) FROM complaintreasonlink JOIN complaint ON complaint.id = complaintreasonlink.complaint_id GROUP BY date(complaint.created_at), complaintreasonlink.reason_id")
+
+
+def downgrade() -> None:
+    # ### commands auto generated by rewire_sqlmodel - please adjust! ###
+    op.drop_table('dailystat')
+    # ### end Alembic commands ###
+
+
+_Meta = MetaData()
+schema = {
+    'aspect': Table(
+        'aspect',
+        _Meta,
+        Column(
+            'id',
+            Integer(),
+            primary_key=True,
+            nullable=False,
+        ),
+        Column(
+            'position',
+            Integer(),
+            nullable=False,
+        ),
+        Column(
+            'is_enabled',
+            Boolean(),
+            nullable=False,
+        ),
+        Column(
+            'name',
+            AutoString(),
+            nullable=False,
+        ),
+        PrimaryKeyConstraint(
+            'id',
+        ),
+        Index(
+            'ix_aspect_position',
+            'position',
+            unique=False,
+        ),
+    ),
+    'complaint': Table(
+        'complaint',
+        _Meta,
+        Column(
+            'id',
+            Integer(),
+            primary_key=True,
+            nullable=False,
+        ),
+        Column(
+            'created_at',
+            DateTime(),
+            nullable=False,
+        ),
+        Column(
+            'contact_name',
+            AutoString(),
+            nullable=True,
+        ),
+        Column(
+            'contact_phone',
+            AutoString(),
+            nullable=True,
+        ),
+        Column(
+            'complaint_text',
+            AutoString(),
+            nullable=True,
+        ),
+        PrimaryKeyConstraint(
+            'id',
+        ),
+    ),
+    'dailystat': Table(
+        'dailystat',
+        _Meta,
+        Column(
+            'day',
+            Date(),
+            primary_key=True,
+            nullable=False,
+        ),
+        Column(
+            'kind',
+            AutoString(),
+            primary_key=True,
+            nullable=False,
+        ),
+        Column(
+            'item_id',
+            Integer(),
+            primary_key=True,
+            nullable=False,
+        ),
+        Column(
+            'total',
+            Integer(),
+            nullable=False,
+        ),
+        PrimaryKeyConstraint(
+            'day',
+            'kind',
+            'item_id',
+        ),
+    ),
+    'doctor': Table(
+        'doctor',
+        _Meta,
+        Column(
+            'id',
+            Integer(),
+            primary_key=True,
+            nullable=False,
+        ),
+        Column(
+            'position',
+            Integer(),
+            nullable=False,
+        ),
+        Column(
+            'is_enabled',
+            Boolean(),
+            nullable=False,
+        ),
+        Column(
+            'name',
+            AutoString(),
+            nullable=False,
+        ),
+        Column(
+            'role',
+            AutoString(),
+            nullable=False,
+        ),
+        Column(
+            'avatar_url',
+            AutoString(),
+            nullable=True,
+        ),
+        PrimaryKeyConstraint(
+            'id',
+        ),
+        Index(
+            'ix_doctor_position',
+            'position',
+            unique=False,
+        ),
+    ),
+    'news': Table(
+        'news',
+        _Meta,
+        Column(
+            'id',
+            Integer(),
+            primary_key=True,
+            nullable=False,
+        ),
+        Column(
+            'position',
+            Integer(),
+            nullable=False,
+        ),
+        Column(
+            'is_enabled',
+            Boolean(),
+            nullable=False,
+        ),
+        Column(
+            'title',
+            AutoString(),
+            nullable=False,
+        ),
+        PrimaryKeyConstraint(
+            'id',
+        ),
+        Index(
+            'ix_news_position',
+            'position',
+            unique=False,
+        ),
+    ),
+    'notification': Table(
+        'notification',
+        _Meta,
+        Column(
+            'id',
+            Integer(),
+            primary_key=True,
+            nullable=False,
+        ),
+        Column(
+            'created_at',
+            DateTime(),
+            nullable=False,
+        ),
+        Column(
+            'platform',
+            AutoString(),
+            nullable=False,
+        ),
+        Column(
+            'chat_id',
+            Integer(),
+            nullable=False,
+        ),
+        Column(
+            'message_text',
+            AutoString(),
+            nullable=False,
+        ),
+        Column(
+            'attempts',
+            Integer(),
+            nullable=False,
+        ),
+        Column(
+            'next_attempt_at',
+            DateTime(),
+            nullable=False,
+        ),
+        Column(
+            'sent_at',
+            DateTime(),
+            nullable=True,
+        ),
+        PrimaryKeyConstraint(
+            'id',
+        ),
+        Index(
+            'ix_notification_next_attempt_at',
+            'next_attempt_at',
+            unique=False,
+        ),
+    ),
+    'platform': Table(
+        'platform',
+        _Meta,
+        Column(
+            'id',
+            Integer(),
+            primary_key=True,
+            nullable=False,
+        ),
+        Column(
+            'position',
+            Integer(),
+            nullable=False,
+        ),
+        Column(
+            'is_enabled',
+            Boolean(),
+            nullable=False,
+        ),
+        Column(
+            'name',
+            AutoString(),
+            nullable=False,
+        ),
+        Column(
+            'url',
+            AutoString(),
+            nullable=False,
+        ),
+        Column(
+            'image_url',
+            AutoString(),
+            nullable=True,
+        ),
+        PrimaryKeyConstraint(
+            'id',
+        ),
+        Index(
+            'ix_platform_position',
+            'position',
+            unique=False,
+        ),
+    ),
+    'prompt': Table(
+        'prompt',
+        _Meta,
+        Column(
+            'id',
+            AutoString(),
+            primary_key=True,
+            nullable=False,
+        ),
+        Column(
+            'created_at',
+            DateTime(),
+            nullable=False,
+        ),
+        Column(
+            'prompt_text',
+            AutoString(),
+            nullable=False,
+        ),
+        Column(
+            'temperature',
+            Float(),
+            nullable=False,
+        ),
+        Column(
+            'frequency_penalty',
+            Float(),
+            nullable=False,
+        ),
+        PrimaryKeyConstraint(
+            'id',
+        ),
+    ),
+    'reason': Table(
+        'reason',
+        _Meta,
+        Column(
+            'id',
+            Integer(),
+            primary_key=True,
+            nullable=False,
+        ),
+        Column(
+            'position',
+            Integer(),
+            nullable=False,
+        ),
+        Column(
+            'is_enabled',
+            Boolean(),
+            nullable=False,
+        ),
+        Column(
+            'name',
+            AutoString(),
+            nullable=False,
+        ),
+        PrimaryKeyConstraint(
+            'id',
+        ),
+        Index(
+            'ix_reason_position',
+            'position',
+            unique=False,
+        ),
+    ),
+    'review': Table(
+        'review',
+        _Meta,
+        Column(
+            'id',
+            Integer(),
+            primary_key=True,
+            nullable=False,
+        ),
+        Column(
+            'created_at',
+            DateTime(),
+            nullable=False,
+        ),
+        Column(
+            'contact_name',
+            AutoString(),
+            nullable=True,
+        ),
+        Column(
+            'contact_phone',
+            AutoString(),
+            nullable=True,
+        ),
+        Column(
+            'review_text',
+            AutoString(),
+            nullable=True,
+        ),
+        PrimaryKeyConstraint(
+            'id',
+        ),
+    ),
+    'reward': Table(
+        'reward',
+        _Meta,
+        Column(
+            'id',
+            Integer(),
+            primary_key=True,
+            nullable=False,
+        ),
+        Column(
+            'position',
+            Integer(),
+            nullable=False,
+        ),
+        Column(
+            'is_enabled',
+            Boolean(),
+            nullable=False,
+        ),
+        Column(
+            'name',
+            AutoString(),
+            nullable=False,
+        ),
+        Column(
+            'image_url',
+            AutoString(),
+            nullable=True,
+        ),
+        PrimaryKeyConstraint(
+            'id',
+        ),
+        Index(
+            'ix_reward_position',
+            'position',
+            unique=False,
+        ),
+    ),
+    'service': Table(
+        'service',
+        _Meta,
+        Column(
+            'id',
+            Integer(),
+            primary_key=True,
+            nullable=False,
+        ),
+        Column(
+            'position',
+            Integer(),
+            nullable=False,
+        ),
+        Column(
+            'is_enabled',
+            Boolean(),
+            nullable=False,
+        ),
+        Column(
+            'name',
+            AutoString(),
+            nullable=False,
+        ),
+        Column(
+            'category',
+            AutoString(),
+            nullable=False,
+        ),
+        PrimaryKeyConstraint(
+            'id',
+        ),
+        Index(
+            'ix_service_position',
+            'position',
+            unique=False,
+        ),
+    ),
+    'source': Table(
+        'source',
+        _Meta,
+        Column(
+            'id',
+            Integer(),
+            primary_key=True,
+            nullable=False,
+        ),
+        Column(
+            'position',
+            Integer(),
+            nullable=False,
+        ),
+        Column(
+            'is_enabled',
+            Boolean(),
+            nullable=False,
+        ),
+        Column(
+            'name',
+            AutoString(),
+            nullable=False,
+        ),
+        PrimaryKeyConstraint(
+            'id',
+        ),
+        Index(
+            'ix_source_position',
+            'position',
+            unique=False,
+        ),
+    ),
+    'user': Table(
+        'user',
+        _Meta,
+        Column(
+            'id',
+            Integer(),
+            primary_key=True,
+            nullable=False,
+        ),
+        Column(
+            'name',
+            AutoString(),
+            nullable=False,
+        ),
+        Column(
+            'username',
+            AutoString(),
+            nullable=False,
+        ),
+        Column(
+            'password_hash',
+            AutoString(),
+            nullable=False,
+        ),
+        Column(
+            'is_admin',
+            Boolean(),
+            nullable=False,
+        ),
+        Column(
+            'is_owner',
+            Boolean(),
+            nullable=False,
+        ),
+        Column(
+            'avatar_url',
+            AutoString(),
+            nullable=True,
+        ),
+        Column(
+            'max_id',
+            Integer(),
+            nullable=True,
+        ),
+        Column(
+            'max_name',
+            AutoString(),
+            nullable=True,
+        ),
+        Column(
+            'telegram_id',
+            Integer(),
+            nullable=True,
+        ),
+        Column(
+            'telegram_name',
+            AutoString(),
+            nullable=True,
+        ),
+        Column(
+            'token_version',
+            Integer(),
+            nullable=False,
+        ),
+        PrimaryKeyConstraint(
+            'id',
+        ),
+    ),
+    'complaintreasonlink': Table(
+        'complaintreasonlink',
+        _Meta,
+        Column(
+            'complaint_id',
+            Integer(),
+            primary_key=True,
+            nullable=False,
+        ),
+        Column(
+            'reason_id',
+            Integer(),
+            primary_key=True,
+            nullable=False,
+        ),
+        PrimaryKeyConstraint(
+            'complaint_id',
+            'reason_id',
+        ),
+        ForeignKeyConstraint(
+            ['complaint_id'],
+            [
+                'complaint.id',
+            ],
+            name='fk_complaintreasonlink_complaint_id_complaint',
+        ),
+        ForeignKeyConstraint(
+            ['reason_id'],
+            [
+                'reason.id',
+            ],
+            name='fk_complaintreasonlink_reason_id_reason',
+        ),
+    ),
+    'doctorservicelink': Table(
+        'doctorservicelink',
+        _Meta,
+        Column(
+            'doctor_id',
+            Integer(),
+            primary_key=True,
+            nullable=False,
+        ),
+        Column(
+            'service_id',
+            Integer(),
+            primary_key=True,
+            nullable=False,
+        ),
+        ForeignKeyConstraint(
+            ['service_id'],
+            [
+                'service.id',
+            ],
+            name='fk_doctorservicelink_service_id_service',
+        ),
+        ForeignKeyConstraint(
+            ['doctor_id'],
+            [
+                'doctor.id',
+            ],
+            name='fk_doctorservicelink_doctor_id_doctor',
+        ),
+        PrimaryKeyConstraint(
+            'doctor_id',
+            'service_id',
+        ),
+    ),
+    'reviewaspectlink': Table(
+        'reviewaspectlink',
+        _Meta,
+        Column(
+            'review_id',
+            Integer(),
+            primary_key=True,
+            nullable=False,
+        ),
+        Column(
+            'aspect_id',
+            Integer(),
+            primary_key=True,
+            nullable=False,
+        ),
+        ForeignKeyConstraint(
+            ['review_id'],
+            [
+                'review.id',
+            ],
+            name='fk_reviewaspectlink_review_id_review',
+        ),
+        ForeignKeyConstraint(
+            ['aspect_id'],
+            [
+                'aspect.id',
+            ],
+            name='fk_reviewaspectlink_aspect_id_aspect',
+        ),
+        PrimaryKeyConstraint(
+            'review_id',
+            'aspect_id',
+        ),
+    ),
+    'reviewdoctorlink': Table(
+        'reviewdoctorlink',
+        _Meta,
+        Column(
+            'review_id',
+            Integer(),
+            primary_key=True,
+            nullable=False,
+        ),
+        Column(
+            'doctor_id',
+            Integer(),
+            primary_key=True,
+            nullable=False,
+        ),
+        ForeignKeyConstraint(
+            ['doctor_id'],
+            [
+                'doctor.id',
+            ],
+            name='fk_reviewdoctorlink_doctor_id_doctor',
+        ),
+        PrimaryKeyConstraint(
+            'review_id',
+            'doctor_id',
+        ),
+        ForeignKeyConstraint(
+            ['review_id'],
+            [
+                'review.id',
+            ],
+            name='fk_reviewdoctorlink_review_id_review',
+        ),
+    ),
+    'reviewplatformlink': Table(
+        'reviewplatformlink',
+        _Meta,
+        Column(
+            'review_id',
+            Integer(),
+            primary_key=True,
+            nullable=False,
+        ),
+        Column(
+            'platform_id',
+            Integer(),
+            primary_key=True,
+            nullable=False,
+        ),
+        ForeignKeyConstraint(
+            ['platform_id'],
+            [
+                'platform.id',
+            ],
+            name='fk_reviewplatformlink_platform_id_platform',
+        ),
+        PrimaryKeyConstraint(
+            'review_id',
+            'platform_id',
+        ),
+        ForeignKeyConstraint(
+            ['review_id'],
+            [
+                'review.id',
+            ],
+            name='fk_reviewplatformlink_review_id_review',
+        ),
+    ),
+    'reviewrewardlink': Table(
+        'reviewrewardlink',
+        _Meta,
+        Column(
+            'review_id',
+            Integer(),
+            primary_key=True,
+            nullable=False,
+        ),
+        Column(
+            'reward_id',
+            Integer(),
+            primary_key=True,
+            nullable=False,
+        ),
+        ForeignKeyConstraint(
+            ['review_id'],
+            [
+                'review.id',
+            ],
+            name='fk_reviewrewardlink_review_id_review',
+        ),
+        ForeignKeyConstraint(
+            ['reward_id'],
+            [
+                'reward.id',
+            ],
+            name='fk_reviewrewardlink_reward_id_reward',
+        ),
+        PrimaryKeyConstraint(
+            'review_id',
+            'reward_id',
+        ),
+    ),
+    'reviewservicelink': Table(
+        'reviewservicelink',
+        _Meta,
+        Column(
+            'review_id',
+            Integer(),
+            primary_key=True,
+            nullable=False,
+        ),
+        Column(
+            'service_id',
+            Integer(),
+            primary_key=True,
+            nullable=False,
+        ),
+        PrimaryKeyConstraint(
+            'review_id',
+            'service_id',
+        ),
+        ForeignKeyConstraint(
+            ['review_id'],
+            [
+                'review.id',
+            ],
+            name='fk_reviewservicelink_review_id_review',
+        ),
+        ForeignKeyConstraint(
+            ['service_id'],
+            [
+                'service.id',
+            ],
+            name='fk_reviewservicelink_service_id_service',
+        ),
+    ),
+    'reviewsourcelink': Table(
+        'reviewsourcelink',
+        _Meta,
+        Column(
+            'review_id',
+            Integer(),
+            primary_key=True,
+            nullable=False,
+        ),
+        Column(
+            'source_id',
+            Integer(),
+            primary_key=True,
+            nullable=False,
+        ),
+        ForeignKeyConstraint(
+            ['review_id'],
+            [
+                'review.id',
+            ],
+            name='fk_reviewsourcelink_review_id_review',
+        ),
+        ForeignKeyConstraint(
+            ['source_id'],
+            [
+                'source.id',
+            ],
+            name='fk_reviewsourcelink_source_id_source',
+        ),
+        PrimaryKeyConstraint(
+            'review_id',
+            'source_id',
+        ),
+    ),
+}
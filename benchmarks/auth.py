@@ -0,0 +1,188 @@
+import asyncio
+import os
+import statistics
+import sys
+import tempfile
+import time
+import tracemalloc
+from typing import Awaitable, Callable, List
+
+DATABASE_PATH = os.path.join(tempfile.mkdtemp(), 'benchmark.db')
+
+os.environ.setdefault('DATABASE_URL', f'sqlite:///{DATABASE_PATH}')
+os.environ.setdefault('JWT_SECRET', 'benchmark-secret')
+os.environ.setdefault('JWT_ALGORITHM', 'HS256')
+os.environ.setdefault('TELEGRAM_TOKEN', '123456:benchmark')
+os.environ.setdefault('MAX_TOKEN', 'benchmark')
+os.environ.setdefault('LOG_LEVEL', 'WARNING')
+
+import bcrypt
+import httpx
+import jwt
+from fastapi import FastAPI
+from fastapi.security import HTTPAuthorizationCredentials, HTTPBearer
+from hashids import Hashids
+from rewire import DependenciesModule, LoaderModule, Space
+from rewire.config import ConfigModule
+from rewire_sqlmodel import transaction
+from sqlalchemy.ext.asyncio import AsyncEngine
+from starlette.requests import Request
+
+USERS_COUNT = int(os.environ.get('BENCHMARK_USERS', 1000))
+ITERATIONS = int(os.environ.get('BENCHMARK_ITERATIONS', 2000))
+
+
+async def measure(name: str, func: Callable[[], Awaitable], iterations: int = ITERATIONS):
+    for _ in range(min(iterations, 100)):
+        await func()
+
+    timings: List[float] = []
+    for _ in range(iterations):
+        started_at = time.perf_counter_ns()
+        await func()
+        timings.append((time.perf_counter_ns() - started_at) / 1000)
+
+    # Allocations are traced in a separate pass, tracemalloc slows every call down
+    peaks: List[int] = []
+    tracemalloc.start()
+    for _ in range(min(iterations, 200)):
+        tracemalloc.reset_peak()
+        current_before, _ = tracemalloc.get_traced_memory()
+        await func()
+        _, peak = tracemalloc.get_traced_memory()
+        peaks.append(peak - current_before)
+    tracemalloc.stop()
+
+    timings.sort()
+    sys.stdout.write(
+        f'{name:<40} '
+        f'p50 {timings[len(timings) // 2]:>9.1f} us  '
+        f'p99 {timings[int(len(timings) * 0.99)]:>9.1f} us  '
+        f'alloc {statistics.mean(peaks) / 1024:>8.1f} KiB\n'
+    )
+
+
+async def run_benchmarks(app: FastAPI):
+    from src import auth
+    from src.models import User
+    from src.schemas import UserResponse
+
+    @transaction(1)
+    async def seed_users() -> List[User]:
+        password_hash = bcrypt.hashpw(b'benchmark', bcrypt.gensalt(4)).decode()
+        users = [
+            User(
+                name=f'User {index}',
+                username=f'user{index}',
+                password_hash=password_hash,
+                is_admin=index % 10 == 0,
+                is_owner=index == 0
+            )
+            for index in range(USERS_COUNT)
+        ]
+
+        for user in users:
+            user.add()
+
+        return users
+
+    users = await seed_users()
+    owner = users[0]
+
+    access_token = auth.generate_access_token(owner)
+    credentials = HTTPAuthorizationCredentials(scheme='Bearer', credentials=access_token)
+    bearer = HTTPBearer()
+    scope = {
+        'type': 'http',
+        'method': 'GET',
+        'path': '/api/user',
+        'headers': [(b'authorization', f'Bearer {access_token}'.encode())],
+    }
+
+    @transaction(1)
+    async def empty_transaction():
+        pass
+
+    @transaction(1)
+    async def get_user_by_id():
+        return await User.get_by_id(owner.id)
+
+    @transaction(1)
+    async def user_required_cold():
+        auth.invalidate_user(owner.id)
+        return await auth.user_required(credentials)
+
+    @transaction(1)
+    async def user_required_cached():
+        return await auth.user_required(credentials)
+
+    @transaction(1)
+    async def admin_required():
+        return await auth.admin_required(credentials)
+
+    @transaction(1)
+    async def owner_required():
+        return await auth.owner_required(credentials)
+
+    async def parse_bearer():
+        return await bearer(Request(scope))
+
+    async def decode_jwt():
+        return jwt.decode(access_token, auth.Config.secret, algorithms=[auth.Config.algorithm])
+
+    async def create_user_response():
+        return UserResponse(**owner.model_dump())
+
+    async def hashids_per_call():
+        encoded_value = Hashids(salt=auth.Config.secret).encode(owner.id)
+        return Hashids(salt=auth.Config.secret).decode(encoded_value)
+
+    async def hashids_cached():
+        return auth.decode_user_id(auth.encode_user_id(owner.id))
+
+    sys.stdout.write(f'Users: {USERS_COUNT}, iterations: {ITERATIONS}\n')
+    await measure('HTTPBearer parsing', parse_bearer)
+    await measure('jwt.decode', decode_jwt)
+    await measure('@transaction(1) wrapper', empty_transaction)
+    await measure('User.get_by_id', get_user_by_id)
+    await measure('UserResponse(**user.model_dump())', create_user_response)
+    await measure('user_required (cold cache)', user_required_cold)
+    await measure('user_required (cached)', user_required_cached)
+    await measure('admin_required', admin_required)
+    await measure('owner_required', owner_required)
+    await measure('Hashids per call (encode + decode)', hashids_per_call)
+    await measure('Hashids cached (encode + decode)', hashids_cached)
+
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url='http://benchmark') as client:
+        headers = {'Authorization': f'Bearer {access_token}'}
+
+        async def get_current_user():
+            response = await client.get('/api/user', headers=headers)
+            response.raise_for_status()
+
+        await measure('GET /api/user', get_current_user, ITERATIONS // 4)
+
+
+async def main():
+    async with Space().init().use():
+        # Migrate the temporary database to head without writing dev migrations into alembic/versions
+        ConfigModule.get().patch({'rewire_sqlmodel': {'alembic': {'generate': False}}})
+
+        import rewire_fastapi
+        import rewire_sqlmodel.ext.fastapi
+
+        await LoaderModule.get().discover().load()
+        await DependenciesModule.get().add(
+            rewire_sqlmodel.plugin,
+            rewire_fastapi.plugin,
+            rewire_sqlmodel.ext.fastapi.plugin
+        ).solve()
+
+        try:
+            await run_benchmarks(DependenciesModule.get().resolve(FastAPI))
+        finally:
+            await DependenciesModule.get().resolve(AsyncEngine).dispose()
+
+
+if __name__ == '__main__':
+    asyncio.run(main())
@@ -1,61 +1,199 @@
+import math
+from datetime import datetime, timedelta, timezone
+from functools import cache
+from typing import Dict, Literal, Optional
+
 import jwt
 from fastapi import Depends, HTTPException
 from fastapi.security import HTTPAuthorizationCredentials, HTTPBearer
 from hashids import Hashids
 from pydantic import BaseModel
 from rewire import config
+from rewire_sqlmodel import session_context
+from sqlalchemy.orm import make_transient_to_detached
+from starlette.requests import Request
 
+from src.cache import TTLCache
 from src.models import User
+from src.ratelimit import SlidingWindowLimiter
 
 
 @config
 class Config(BaseModel):
     secret: str
     algorithm: str
+    access_token_ttl: int = 3600
+    refresh_token_ttl: int = 2592000
+    user_cache_size: int = 1024
+    user_cache_ttl: float = 30
+    login_ip_limit: int = 30
+    login_ip_window: float = 60
+    login_username_limit: int = 5
+    login_username_window: float = 300
+
+
+class TokenClaims(BaseModel):
+    user_id: int
+    is_admin: bool
+    is_owner: bool
+    token_version: int
+    token_type: Literal['access', 'refresh']
+
+
+USER_CACHE = TTLCache(Config.user_cache_size, Config.user_cache_ttl)
+TOKEN_VERSIONS: Dict[int, int] = {}
+
+LOGIN_IP_LIMITER = SlidingWindowLimiter(Config.login_ip_limit, Config.login_ip_window)
+LOGIN_USERNAME_LIMITER = SlidingWindowLimiter(Config.login_username_limit, Config.login_username_window)
+
+
+@cache
+def get_hashids() -> Hashids:
+    return Hashids(salt=Config.secret)
 
 
 def encode_user_id(user_id: int) -> str:
-    encoder = Hashids(salt=Config.secret)
-    return encoder.encode(user_id)
+    return get_hashids().encode(user_id)
 
 
 def decode_user_id(encoded_value: str) -> int:
-    decoder = Hashids(salt=Config.secret)
-    return decoder.decode(encoded_value)[0]
+    return get_hashids().decode(encoded_value)[0]
 
 
-def generate_access_token(user_id: int) -> str:
+def generate_token(user: User, token_type: Literal['access', 'refresh'], token_ttl: int) -> str:
+    issued_at = datetime.now(timezone.utc)
     return jwt.encode(
-        {'user_id': user_id},
+        {
+            'user_id': user.id,
+            'is_admin': user.is_admin,
+            'is_owner': user.is_owner,
+            'token_version': user.token_version,
+            'token_type': token_type,
+            'iat': issued_at,
+            'exp': issued_at + timedelta(seconds=token_ttl),
+        },
         Config.secret,
         Config.algorithm
     )
 
 
-async def user_required(credentials: HTTPAuthorizationCredentials = Depends(HTTPBearer())) -> User:
+def generate_access_token(user: User) -> str:
+    return generate_token(user, 'access', Config.access_token_ttl)
+
+
+def generate_refresh_token(user: User) -> str:
+    return generate_token(user, 'refresh', Config.refresh_token_ttl)
+
+
+async def get_token_version(user_id: int) -> Optional[int]:
+    if user_id not in TOKEN_VERSIONS:
+        user = await User.get_by_id(user_id)
+        if not user:
+            return None
+
+        TOKEN_VERSIONS[user_id] = user.token_version
+
+    return TOKEN_VERSIONS[user_id]
+
+
+def revoke_tokens(user: User):
+    # The cached version is dropped by invalidate_user once the new one is committed
+    user.token_version += 1
+
+
+async def verify_token(token: str, token_type: Literal['access', 'refresh']) -> TokenClaims:
     try:
-        payload = jwt.decode(credentials.credentials, Config.secret, algorithms=[Config.algorithm])
+        payload = jwt.decode(
+            token,
+            Config.secret,
+            algorithms=[Config.algorithm],
+            options={'require': ['exp', 'token_version', 'token_type']}
+        )
+        claims = TokenClaims(**payload)
     except Exception:
         raise HTTPException(401, 'Invalid token!')
 
-    user = await User.get_by_id(payload.get('user_id'))
+    if claims.token_type != token_type:
+        raise HTTPException(401, 'Invalid token!')
+
+    if await get_token_version(claims.user_id) != claims.token_version:
+        raise HTTPException(401, 'Token revoked!')
+
+    return claims
+
+
+def get_client_ip(request: Request) -> str:
+    # Behind a proxy the address comes from X-Forwarded-For, trusted only for uvicorn's forwarded_allow_ips
+    return request.client.host if request.client else 'unknown'
+
+
+async def check_login_attempt(ip_address: str, username: str):
+    for limiter, key in ((LOGIN_IP_LIMITER, ip_address), (LOGIN_USERNAME_LIMITER, username.lower())):
+        retry_after = await limiter.get_retry_after(key)
+        if retry_after is not None:
+            raise HTTPException(
+                429,
+                'Too many login attempts, try again later!',
+                headers={'Retry-After': str(max(1, math.ceil(retry_after)))}
+            )
+
+    await LOGIN_IP_LIMITER.hit(ip_address)
+
+
+async def record_login_failure(username: str):
+    await LOGIN_USERNAME_LIMITER.hit(username.lower())
+
+
+async def record_login_success(username: str):
+    await LOGIN_USERNAME_LIMITER.reset(username.lower())
+
+
+async def get_cached_user(user_id: int) -> Optional[User]:
+    cached_user = USER_CACHE.get(user_id)
+    if cached_user:
+        return await session_context.get().merge(cached_user, load=False)
+
+    user = await User.get_by_id(user_id)
+    if not user:
+        return None
+
+    cached_user = User(**user.model_dump())
+    make_transient_to_detached(cached_user)
+    USER_CACHE.set(user_id, cached_user)
+
+    return user
+
+
+def invalidate_user(user_id: int):
+    USER_CACHE.delete(user_id)
+    TOKEN_VERSIONS.pop(user_id, None)
+
+
+async def claims_required(credentials: HTTPAuthorizationCredentials = Depends(HTTPBearer())) -> TokenClaims:
+    return await verify_token(credentials.credentials, 'access')
+
+
+async def user_required(credentials: HTTPAuthorizationCredentials = Depends(HTTPBearer())) -> User:
+    claims = await claims_required(credentials)
+
+    user = await get_cached_user(claims.user_id)
     if not user:
         raise HTTPException(401, 'Unknown user!')
 
     return user
 
 
-async def admin_required(credentials: HTTPAuthorizationCredentials = Depends(HTTPBearer())) -> User:
-    user = await user_required(credentials)
-    if not user.is_admin:
+async def admin_required(credentials: HTTPAuthorizationCredentials = Depends(HTTPBearer())) -> TokenClaims:
+    claims = await claims_required(credentials)
+    if not claims.is_admin:
         raise HTTPException(403, 'Admin privileges required!')
 
-    return user
+    return claims
 
 
-async def owner_required(credentials: HTTPAuthorizationCredentials = Depends(HTTPBearer())) -> User:
-    user = await user_required(credentials)
-    if not user.is_owner:
+async def owner_required(credentials: HTTPAuthorizationCredentials = Depends(HTTPBearer())) -> TokenClaims:
+    claims = await claims_required(credentials)
+    if not claims.is_owner:
         raise HTTPException(403, 'Owner privileges required!')
 
-    return user
+    return claims
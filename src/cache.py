@@ -0,0 +1,37 @@
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Hashable, Optional, Tuple
+
+
+class TTLCache:
+    def __init__(self, max_size: int, ttl: float):
+        self.max_size = max_size
+        self.ttl = ttl
+        self.items: OrderedDict[Hashable, Tuple[float, Any]] = OrderedDict()
+
+    def get(self, key: Hashable) -> Optional[Any]:
+        item = self.items.get(key)
+        if item is None:
+            return None
+
+        expires_at, value = item
+        if expires_at < time.monotonic():
+            del self.items[key]
+            return None
+
+        self.items.move_to_end(key)
+        return value
+
+    def set(self, key: Hashable, value: Any):
+        self.items[key] = (time.monotonic() + self.ttl, value)
+        self.items.move_to_end(key)
+
+        while len(self.items) > self.max_size:
+            self.items.popitem(last=False)
+
+    def delete(self, key: Hashable):
+        self.items.pop(key, None)
+
+    def delete_where(self, predicate: Callable[[Hashable], bool]):
+        for key in [key for key in self.items if predicate(key)]:
+            del self.items[key]
@@ -0,0 +1,188 @@
+import asyncio
+import hashlib
+from collections import defaultdict
+from functools import wraps
+from typing import Dict, List, Optional, Tuple, Type
+
+from pydantic import BaseModel, TypeAdapter
+from rewire import config
+from rewire_sqlmodel import transaction
+from starlette.requests import Request
+from starlette.responses import Response
+
+from src.models import Aspect, Doctor, ItemModel, News, Platform, Reason, Reward, Service, Source
+from src.schemas import AspectResponse, CatalogResponse, create_doctor_response, DoctorResponse, NewsResponse, PlatformResponse, ReasonResponse, RewardResponse, ServiceResponse, SourceResponse
+from src.utils import is_not_modified
+
+
+@config
+class Config(BaseModel):
+    max_age: int = 0
+    shared_max_age: int = 60
+    stale_while_revalidate: int = 300
+
+
+CATALOG_RESPONSES: Dict[Type[ItemModel], Type[BaseModel]] = {
+    Doctor: DoctorResponse,
+    Service: ServiceResponse,
+    Aspect: AspectResponse,
+    Source: SourceResponse,
+    Reward: RewardResponse,
+    Platform: PlatformResponse,
+    Reason: ReasonResponse,
+    News: NewsResponse,
+}
+
+CATALOG_FIELDS: Dict[Type[ItemModel], str] = {
+    Doctor: 'doctors',
+    Service: 'services',
+    Aspect: 'aspects',
+    Source: 'sources',
+    Reward: 'rewards',
+    Platform: 'platforms',
+    Reason: 'reasons',
+    News: 'news',
+}
+
+DEPENDENT_MODELS: Dict[Type[ItemModel], List[Type[ItemModel]]] = {
+    Service: [Doctor],
+}
+
+
+class CatalogSnapshot(BaseModel):
+    revision: int
+    items: List[BaseModel]
+    content: bytes
+    etag: str
+
+
+class CatalogBody(BaseModel):
+    revisions: Tuple[int, ...]
+    content: bytes
+    etag: str
+
+
+REVISIONS: Dict[Type[ItemModel], int] = defaultdict(int)
+SNAPSHOTS: Dict[Type[ItemModel], CatalogSnapshot] = {}
+LOCKS: Dict[Type[ItemModel], asyncio.Lock] = defaultdict(asyncio.Lock)
+CATALOG_BODY: Optional[CatalogBody] = None
+
+
+def create_item_response(item: ItemModel) -> BaseModel:
+    if isinstance(item, Doctor):
+        return create_doctor_response(item)
+
+    return CATALOG_RESPONSES[type(item)](**item.model_dump())
+
+
+def create_etag(content: bytes) -> str:
+    return f'"{hashlib.sha256(content).hexdigest()[:32]}"'
+
+
+@transaction(1)
+async def load_items(model: Type[ItemModel]) -> List[BaseModel]:
+    return [
+        create_item_response(item)
+        for item in await model.get_all()
+    ]
+
+
+async def get_snapshot(model: Type[ItemModel]) -> CatalogSnapshot:
+    snapshot = SNAPSHOTS.get(model)
+    if snapshot and snapshot.revision == REVISIONS[model]:
+        return snapshot
+
+    async with LOCKS[model]:
+        snapshot = SNAPSHOTS.get(model)
+        if snapshot and snapshot.revision == REVISIONS[model]:
+            return snapshot
+
+        revision = REVISIONS[model]
+        items = await load_items(model)
+        content = TypeAdapter(List[CATALOG_RESPONSES[model]]).dump_json(items)
+
+        snapshot = CatalogSnapshot(revision=revision, items=items, content=content, etag=create_etag(content))
+        SNAPSHOTS[model] = snapshot
+
+    return snapshot
+
+
+def get_enabled_items(items: List[BaseModel]) -> List[BaseModel]:
+    enabled_items = []
+    for item in items:
+        if not item.is_enabled:
+            continue
+
+        if isinstance(item, DoctorResponse):
+            item = item.model_copy(update={'services': [service for service in item.services if service.is_enabled]})
+
+        enabled_items.append(item)
+
+    return enabled_items
+
+
+async def get_catalog_body() -> CatalogBody:
+    global CATALOG_BODY
+
+    snapshots = {
+        model: await get_snapshot(model)
+        for model in CATALOG_FIELDS
+    }
+
+    revisions = tuple(snapshot.revision for snapshot in snapshots.values())
+    if CATALOG_BODY and CATALOG_BODY.revisions == revisions:
+        return CATALOG_BODY
+
+    catalog = CatalogResponse(**{
+        CATALOG_FIELDS[model]: get_enabled_items(snapshot.items)
+        for model, snapshot in snapshots.items()
+    })
+
+    content = catalog.model_dump_json().encode()
+    CATALOG_BODY = CatalogBody(revisions=revisions, content=content, etag=create_etag(content))
+    return CATALOG_BODY
+
+
+def create_cached_response(request: Request, content: bytes, etag: str) -> Response:
+    headers = {
+        'ETag': etag,
+        'Cache-Control': (
+            f'public, max-age={Config.max_age}, s-maxage={Config.shared_max_age}, '
+            f'stale-while-revalidate={Config.stale_while_revalidate}'
+        )
+    }
+
+    if is_not_modified(request, etag):
+        return Response(status_code=304, headers=headers)
+
+    return Response(content, media_type='application/json', headers=headers)
+
+
+async def create_items_response(request: Request, model: Type[ItemModel]) -> Response:
+    snapshot = await get_snapshot(model)
+    return create_cached_response(request, snapshot.content, snapshot.etag)
+
+
+async def create_catalog_response(request: Request) -> Response:
+    catalog_body = await get_catalog_body()
+    return create_cached_response(request, catalog_body.content, catalog_body.etag)
+
+
+def invalidate(*models: Type[ItemModel]):
+    for model in models:
+        REVISIONS[model] += 1
+        for dependent_model in DEPENDENT_MODELS.get(model, []):
+            REVISIONS[dependent_model] += 1
+
+
+def invalidates(*models: Type[ItemModel]):
+    def decorator(func):
+        @wraps(func)
+        async def wrapper(*args, **kwargs):
+            result = await func(*args, **kwargs)
+            invalidate(*models)
+            return result
+
+        return wrapper
+
+    return decorator
@@ -1,4 +1,4 @@
-from typing import List, Optional
+from typing import AsyncIterator, List, Optional
 
 from openai import AsyncOpenAI
 from pydantic import BaseModel
@@ -103,6 +103,38 @@ async def generate_review_text(
     return response.choices[0].message.content.strip()
 
 
+async def stream_review_text(
+        prompt_text: str,
+        temperature: float,
+        frequency_penalty: float,
+        doctors: List[Doctor],
+        services: List[Service],
+        aspects: List[Aspect],
+        source: Optional[Source]
+) -> AsyncIterator[str]:
+    user_prompt = format_review_user_prompt(
+        doctors=doctors,
+        services=services,
+        aspects=aspects,
+        source=source
+    )
+
+    stream = await CLIENT.chat.completions.create(
+        model=f'gpt://{Config.project}/yandexgpt/latest',
+        temperature=temperature,
+        frequency_penalty=frequency_penalty,
+        stream=True,
+        messages=[  # type: ignore
+            {'role': 'system', 'content': prompt_text},
+            {'role': 'user', 'content': user_prompt},
+        ]
+    )
+
+    async for chunk in stream:
+        if chunk.choices and chunk.choices[0].delta.content:
+            yield chunk.choices[0].delta.content
+
+
 async def test_prompt_text(prompt_text: str, temperature: float, frequency_penalty: float):
     response = await CLIENT.chat.completions.create(
         model=f'gpt://{Config.project}/yandexgpt/latest',
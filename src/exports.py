@@ -0,0 +1,196 @@
+import asyncio
+import os
+import time
+import uuid
+from datetime import datetime
+from typing import AsyncIterator, Callable, Dict, List, Literal, Optional, Type
+
+import aiofiles
+from fastapi import HTTPException
+from pydantic import BaseModel
+from rewire import config, DependenciesModule, logger, simple_plugin
+from rewire_sqlmodel import SQLModel
+from sqlalchemy.ext.asyncio import AsyncEngine
+from sqlmodel import func, select
+from starlette.responses import StreamingResponse
+
+from src.jobs import Job, JobQueue
+from src.models import Complaint, ComplaintReasonLink, DateModel, Doctor, ItemModel, Platform, Reason, Review, ReviewDoctorLink, ReviewPlatformLink, ReviewRewardLink, ReviewServiceLink, Reward, Service
+from src.utils import stream_rows_to_csv, stream_rows_to_excel, stream_rows_to_ndjson
+
+
+@config
+class Config(BaseModel):
+    directory: str = 'exports'
+    workers: int = 2
+    queue_size: int = 20
+    job_ttl: int = 3600
+    cleanup_interval: float = 300
+    max_streamed_xlsx_rows: int = 10000
+
+
+plugin = simple_plugin()
+EXPORT_JOBS = JobQueue(Config.queue_size, Config.job_ttl)
+
+ExportFormat = Literal['xlsx', 'csv', 'ndjson']
+
+EXPORT_FORMATS = {
+    'xlsx': (stream_rows_to_excel, 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'),
+    'csv': (stream_rows_to_csv, 'text/csv; charset=utf-8'),
+    'ndjson': (stream_rows_to_ndjson, 'application/x-ndjson'),
+}
+
+REVIEW_COLUMNS = ['Пациент', 'Телефон', 'Врач', 'Услуга', 'Подарок', 'Платформы', 'Текст отзыва']
+COMPLAINT_COLUMNS = ['Пациент', 'Телефон', 'Причины', 'Текст жалобы']
+
+
+def aggregate_names(item_model: Type[ItemModel], link_model: Type[SQLModel], owner_column, item_column, owner_id_column):
+    # The ordered inner select keeps names in catalog order, it has to be correlated to the owner
+    # explicitly because SQLAlchemy never auto-correlates a derived table in FROM
+    names = (
+        select(item_model.name)
+        .select_from(link_model)
+        .join(item_model, item_model.id == item_column)
+        .where(owner_column == owner_id_column)
+        .order_by(item_model.position, item_model.id)
+        .correlate(owner_id_column.table)
+        .subquery()
+    )
+
+    return select(func.aggregate_strings(names.c.name, ', ')).scalar_subquery()
+
+
+def create_reviews_query(date_after: Optional[datetime] = None, date_before: Optional[datetime] = None):
+    return (
+        select(
+            Review.contact_name,
+            Review.contact_phone,
+            aggregate_names(Doctor, ReviewDoctorLink, ReviewDoctorLink.review_id, ReviewDoctorLink.doctor_id, Review.id),
+            aggregate_names(Service, ReviewServiceLink, ReviewServiceLink.review_id, ReviewServiceLink.service_id, Review.id),
+            aggregate_names(Reward, ReviewRewardLink, ReviewRewardLink.review_id, ReviewRewardLink.reward_id, Review.id),
+            aggregate_names(Platform, ReviewPlatformLink, ReviewPlatformLink.review_id, ReviewPlatformLink.platform_id, Review.id),
+            Review.review_text
+        )
+        .where(*Review.filter_between(date_after, date_before))
+        .order_by(Review.created_at, Review.id)
+    )
+
+
+def create_complaints_query(date_after: Optional[datetime] = None, date_before: Optional[datetime] = None):
+    return (
+        select(
+            Complaint.contact_name,
+            Complaint.contact_phone,
+            aggregate_names(Reason, ComplaintReasonLink, ComplaintReasonLink.complaint_id, ComplaintReasonLink.reason_id, Complaint.id),
+            Complaint.complaint_text
+        )
+        .where(*Complaint.filter_between(date_after, date_before))
+        .order_by(Complaint.created_at, Complaint.id)
+    )
+
+
+async def stream_rows(query, column_names: List[str], batch_size: int = 1000) -> AsyncIterator[Dict]:
+    engine = DependenciesModule.get().resolve(AsyncEngine)
+    async with engine.connect() as connection:
+        result = await connection.stream(query.execution_options(yield_per=batch_size))
+        async for row in result:
+            yield dict(zip(column_names, row))
+
+
+def stream_review_rows(date_after: Optional[datetime] = None, date_before: Optional[datetime] = None) -> AsyncIterator[Dict]:
+    return stream_rows(create_reviews_query(date_after, date_before), REVIEW_COLUMNS)
+
+
+def stream_complaint_rows(date_after: Optional[datetime] = None, date_before: Optional[datetime] = None) -> AsyncIterator[Dict]:
+    return stream_rows(create_complaints_query(date_after, date_before), COMPLAINT_COLUMNS)
+
+
+async def requires_export_job(
+        model: Type[DateModel],
+        export_format: ExportFormat,
+        date_after: Optional[datetime] = None,
+        date_before: Optional[datetime] = None
+) -> bool:
+    # XLSX bytes only start flowing once the whole workbook is built, so big ones are exported as jobs
+    if export_format != 'xlsx':
+        return False
+
+    return await model.count_between(date_after, date_before) > Config.max_streamed_xlsx_rows
+
+
+def create_export_response(rows: AsyncIterator[Dict], column_names: List[str], export_format: ExportFormat) -> StreamingResponse:
+    stream_rows_to_format, media_type = EXPORT_FORMATS[export_format]
+    return StreamingResponse(stream_rows_to_format(rows, column_names), media_type=media_type)
+
+
+async def write_export_file(rows: AsyncIterator[Dict], column_names: List[str], export_format: ExportFormat) -> str:
+    stream_rows_to_format, _ = EXPORT_FORMATS[export_format]
+
+    filename = f'{uuid.uuid4().hex}.{export_format}'
+    file_path = os.path.join(Config.directory, filename)
+    temp_path = f'{file_path}.tmp'
+
+    try:
+        async with aiofiles.open(temp_path, 'wb') as output_file:
+            async for chunk in stream_rows_to_format(rows, column_names):
+                await output_file.write(chunk)
+
+        os.replace(temp_path, file_path)
+    finally:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+
+    return filename
+
+
+def submit_export(rows: Callable[[], AsyncIterator[Dict]], column_names: List[str], export_format: ExportFormat) -> Job:
+    return EXPORT_JOBS.submit(lambda: write_export_file(rows(), column_names, export_format))
+
+
+def get_export_job(job_id: str) -> Job:
+    job = EXPORT_JOBS.get(job_id)
+    if not job:
+        raise HTTPException(404, 'Job not found!')
+
+    return job
+
+
+def get_export_file_path(job_id: str) -> str:
+    job = get_export_job(job_id)
+    if job.status != 'completed':
+        raise HTTPException(409, 'Export is not ready!')
+
+    file_path = os.path.join(Config.directory, job.result)
+    if not os.path.isfile(file_path):
+        raise HTTPException(404, 'Export expired!')
+
+    return file_path
+
+
+def remove_expired_files():
+    EXPORT_JOBS.cleanup()
+
+    expired_before = time.time() - Config.job_ttl
+    for entry in os.scandir(Config.directory):
+        if entry.is_file() and entry.stat().st_mtime < expired_before:
+            os.remove(entry.path)
+
+
+async def run_cleanup():
+    while True:
+        try:
+            await asyncio.to_thread(remove_expired_files)
+        except Exception as e:
+            logger.exception(f'Failed to remove expired exports: {e}')
+
+        await asyncio.sleep(Config.cleanup_interval)
+
+
+@plugin.setup()
+def create_directory():
+    os.makedirs(Config.directory, exist_ok=True)
+
+
+@plugin.run()
+async def run_export_workers():
+    await asyncio.gather(EXPORT_JOBS.run(Config.workers), run_cleanup())
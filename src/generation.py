@@ -0,0 +1,120 @@
+import asyncio
+import json
+from typing import Any, AsyncIterator, Dict, Tuple
+
+from fastapi import HTTPException
+from openai import OpenAIError
+from pydantic import BaseModel
+from rewire import config, logger, simple_plugin
+from rewire_sqlmodel import session_context, transaction
+
+from src import chatgpt
+from src.jobs import Job, JobQueue
+from src.models import Prompt, Review
+from src.schemas import create_review_response, ReviewResponse
+from src.outbox import add_alert_notifications
+from src.utils import create_review_alert_text
+
+
+@config
+class Config(BaseModel):
+    workers: int = 4
+    queue_size: int = 100
+    job_ttl: int = 600
+
+
+plugin = simple_plugin()
+GENERATION_JOBS = JobQueue(Config.queue_size, Config.job_ttl)
+STREAM_SLOTS = asyncio.Semaphore(Config.workers)
+
+
+@plugin.run()
+async def run_generation_workers():
+    await GENERATION_JOBS.run(Config.workers)
+
+
+@transaction(1)
+async def load_review_prompt(review_id: int) -> Tuple[Review, Prompt]:
+    review = await Review.get_by_id(review_id)
+    if not review:
+        raise HTTPException(404, 'Review not found!')
+
+    reviews_prompt = await Prompt.get_by_id('reviews')
+    if not reviews_prompt:
+        raise HTTPException(404, 'Reviews prompt not found!')
+
+    return review, reviews_prompt
+
+
+@transaction(1)
+async def save_review_text(review_id: int, review_text: str) -> Review:
+    review = await Review.get_by_id(review_id)
+    if not review:
+        raise HTTPException(404, 'Review not found!')
+
+    review.review_text = review_text
+    review.add()
+
+    await add_alert_notifications(create_review_alert_text(review))
+    await session_context.get().commit()
+    return review
+
+
+async def generate_review(review_id: int) -> ReviewResponse:
+    review, reviews_prompt = await load_review_prompt(review_id)
+
+    review_text = await chatgpt.generate_review_text(
+        prompt_text=reviews_prompt.prompt_text,
+        temperature=reviews_prompt.temperature,
+        frequency_penalty=reviews_prompt.frequency_penalty,
+        doctors=review.selected_doctors,
+        services=review.selected_services,
+        aspects=review.selected_aspects,
+        source=review.selected_source
+    )
+
+    review = await save_review_text(review_id, review_text)
+
+    return create_review_response(review)
+
+
+def create_event(event: str, data: Dict[str, Any]) -> str:
+    return f'event: {event}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n'
+
+
+async def stream_review(review: Review, reviews_prompt: Prompt) -> AsyncIterator[str]:
+    # Streams call OpenAI outside GENERATION_JOBS, so they are capped at the same number of workers
+    async with STREAM_SLOTS:
+        text_chunks = []
+        try:
+            async for text_chunk in chatgpt.stream_review_text(
+                    prompt_text=reviews_prompt.prompt_text,
+                    temperature=reviews_prompt.temperature,
+                    frequency_penalty=reviews_prompt.frequency_penalty,
+                    doctors=review.selected_doctors,
+                    services=review.selected_services,
+                    aspects=review.selected_aspects,
+                    source=review.selected_source
+            ):
+                text_chunks.append(text_chunk)
+                yield create_event('token', {'text': text_chunk})
+        except OpenAIError as e:
+            logger.error(f'Failed to stream review {review.id}: {e}')
+            yield create_event('error', {'detail': 'Failed to generate review text!'})
+            return
+
+        review = await save_review_text(review.id, ''.join(text_chunks).strip())
+
+        yield create_event('done', create_review_response(review).model_dump(mode='json'))
+
+
+def submit_review_generation(review_id: int) -> Job:
+    return GENERATION_JOBS.submit(lambda: generate_review(review_id))
+
+
+def get_generation_job(job_id: str) -> Job:
+    job = GENERATION_JOBS.get(job_id)
+    if not job:
+        raise HTTPException(404, 'Job not found!')
+
+    return job
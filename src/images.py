@@ -0,0 +1,308 @@
+import asyncio
+import hashlib
+import mimetypes
+import multiprocessing
+import os
+import time
+import uuid
+from concurrent.futures import ProcessPoolExecutor
+from string import hexdigits
+from typing import List, Optional, Set
+from urllib.parse import urlparse
+
+import aiofiles
+import puremagic
+from fastapi import FastAPI, HTTPException, UploadFile
+from pydantic import BaseModel
+from rewire import config, logger, simple_plugin
+from rewire_sqlmodel import session_context
+from sqlmodel import select
+from starlette.requests import Request
+from starlette.responses import FileResponse, JSONResponse, Response
+
+from src.cache import TTLCache
+from src.models import Doctor, Platform, Reward, User
+from src.utils import is_not_modified
+from src.variants import create_image_variants, get_variant_filename
+
+
+@config
+class Config(BaseModel):
+    directory: str = 'images'
+    max_size: int = 10485760
+    multipart_overhead: int = 65536
+    chunk_size: int = 65536
+    header_size: int = 2048
+    sweep_grace_period: int = 86400
+    variant_widths: List[int] = [160, 320, 640]
+    variant_formats: List[str] = ['avif', 'webp']
+    variant_quality: int = 80
+    variant_workers: int = 2
+    max_age: int = 31536000
+    memory_cache_size: int = 256
+    memory_cache_ttl: float = 3600
+    memory_cache_file_size: int = 65536
+
+
+class CachedImage(BaseModel):
+    content: bytes
+    media_type: str
+
+
+plugin = simple_plugin()
+EXECUTOR = ProcessPoolExecutor(max_workers=Config.variant_workers, mp_context=multiprocessing.get_context('spawn'))
+IMAGE_CACHE = TTLCache(Config.memory_cache_size, Config.memory_cache_ttl)
+
+IMAGE_URL_COLUMNS = [
+    User.avatar_url,
+    Doctor.avatar_url,
+    Reward.image_url,
+    Platform.image_url,
+]
+
+
+@plugin.setup()
+def create_directory():
+    os.makedirs(get_variants_directory(), exist_ok=True)
+
+
+@plugin.setup()
+def add_upload_size_limit(app: FastAPI):
+    app.middleware('http')(limit_upload_size)
+
+
+async def limit_upload_size(request: Request, call_next):
+    # Starlette spools the whole multipart body before the route runs, so oversized uploads are refused up front
+    if not request.headers.get('content-type', '').startswith('multipart/form-data'):
+        return await call_next(request)
+
+    content_length = request.headers.get('content-length')
+    if not content_length or not content_length.isdigit():
+        return JSONResponse({'detail': 'Content-Length is required!'}, 411)
+
+    if int(content_length) > Config.max_size + Config.multipart_overhead:
+        return JSONResponse({'detail': 'Image is too large!'}, 413)
+
+    return await call_next(request)
+
+
+def get_variants_directory() -> str:
+    return os.path.join(Config.directory, 'variants')
+
+
+def detect_image_extension(header: bytes) -> str:
+    if not header:
+        raise HTTPException(400, 'Image is empty!')
+
+    try:
+        mime_type = puremagic.from_string(header, mime=True)
+        extension = puremagic.from_string(header)
+    except (puremagic.PureError, ValueError):
+        raise HTTPException(400, 'Only image files are allowed!')
+
+    # SVG may carry scripts and would run same-origin when opened directly
+    if not mime_type.startswith('image/') or mime_type == 'image/svg+xml' or extension == '.svg':
+        raise HTTPException(400, 'Only image files are allowed!')
+
+    return extension
+
+
+async def save_image_file(file: UploadFile) -> str:
+    temp_path = os.path.join(Config.directory, f'.{uuid.uuid4().hex}.tmp')
+    content_hash = hashlib.sha256()
+    header = b''
+    file_size = 0
+
+    try:
+        async with aiofiles.open(temp_path, 'wb') as output_file:
+            while chunk := await file.read(Config.chunk_size):
+                file_size += len(chunk)
+                if file_size > Config.max_size:
+                    raise HTTPException(413, 'Image is too large!')
+
+                if len(header) < Config.header_size:
+                    header += chunk[:Config.header_size - len(header)]
+
+                content_hash.update(chunk)
+                await output_file.write(chunk)
+
+        filename = f'{content_hash.hexdigest()}{detect_image_extension(header)}'
+        file_path = os.path.join(Config.directory, filename)
+
+        # Duplicates go through create_variants too, it returns early once all variants exist
+        if os.path.isfile(file_path):
+            os.utime(file_path)
+        else:
+            os.replace(temp_path, file_path)
+    finally:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+
+    await create_variants(file_path)
+    return filename
+
+
+async def create_variants(file_path: str):
+    try:
+        await asyncio.get_running_loop().run_in_executor(
+            EXECUTOR,
+            create_image_variants,
+            file_path,
+            get_variants_directory(),
+            Config.variant_widths,
+            Config.variant_formats,
+            Config.variant_quality
+        )
+    except Exception as e:
+        logger.exception(f'Failed to create variants for {file_path}: {e}')
+
+
+def get_image_path(filename: str) -> str:
+    file_path = os.path.join(Config.directory, filename)
+    if filename.startswith('.') or not os.path.isfile(file_path):
+        raise HTTPException(404, 'Image not found!')
+
+    return file_path
+
+
+def get_variant_width(width: Optional[int]) -> Optional[int]:
+    if not width:
+        return None
+
+    return next((variant_width for variant_width in sorted(Config.variant_widths) if variant_width >= width), None)
+
+
+def get_accepted_media_types(accept: str) -> Set[str]:
+    media_types = set()
+    for media_range in accept.split(','):
+        media_type, *parameters = media_range.split(';')
+
+        quality = 1.0
+        for parameter in parameters:
+            name, _, value = parameter.partition('=')
+            if name.strip().lower() == 'q':
+                try:
+                    quality = float(value)
+                except ValueError:
+                    quality = 0
+
+        if quality > 0:
+            media_types.add(media_type.strip().lower())
+
+    return media_types
+
+
+def get_accepted_extensions(accept: str) -> List[str]:
+    media_types = get_accepted_media_types(accept)
+    return [
+        f'.{variant_format}'
+        for variant_format in Config.variant_formats
+        if f'image/{variant_format}' in media_types
+    ]
+
+
+def get_image_variant_path(filename: str, width: Optional[int], accept: str) -> str:
+    file_path = get_image_path(filename)
+    stem, extension = os.path.splitext(filename)
+
+    extensions = get_accepted_extensions(accept)
+    variant_width = get_variant_width(width)
+
+    variant_filenames = []
+    if variant_width:
+        variant_filenames += [get_variant_filename(stem, variant_width, variant_extension) for variant_extension in extensions + [extension]]
+
+    variant_filenames += [get_variant_filename(stem, None, variant_extension) for variant_extension in extensions]
+
+    for variant_filename in variant_filenames:
+        variant_path = os.path.join(get_variants_directory(), variant_filename)
+        if os.path.isfile(variant_path):
+            return variant_path
+
+    return file_path
+
+
+def is_content_addressed(filename: str) -> bool:
+    stem, _ = os.path.splitext(filename)
+    return len(stem) == 64 and all(character in hexdigits for character in stem)
+
+
+def create_image_etag(filename: str, width: Optional[int], accept: str) -> str:
+    variant_width = get_variant_width(width) or 0
+    extensions = ''.join(get_accepted_extensions(accept))
+    return f'"{filename}-{variant_width}{extensions}"'
+
+
+async def create_image_response(request: Request, filename: str, width: Optional[int]) -> Response:
+    accept = request.headers.get('accept', '')
+    if not is_content_addressed(filename):
+        return FileResponse(get_image_variant_path(filename, width, accept), headers={'Vary': 'Accept'})
+
+    etag = create_image_etag(filename, width, accept)
+    headers = {
+        'ETag': etag,
+        'Cache-Control': f'public, max-age={Config.max_age}, immutable',
+        'Vary': 'Accept'
+    }
+
+    if is_not_modified(request, etag):
+        return Response(status_code=304, headers=headers)
+
+    cached_image = IMAGE_CACHE.get((filename, etag))
+    if cached_image:
+        return Response(cached_image.content, media_type=cached_image.media_type, headers=headers)
+
+    file_path = get_image_variant_path(filename, width, accept)
+    if os.path.getsize(file_path) > Config.memory_cache_file_size:
+        return FileResponse(file_path, headers=headers)
+
+    async with aiofiles.open(file_path, 'rb') as image_file:
+        cached_image = CachedImage(
+            content=await image_file.read(),
+            media_type=mimetypes.guess_type(file_path)[0] or 'application/octet-stream'
+        )
+
+    IMAGE_CACHE.set((filename, etag), cached_image)
+    return Response(cached_image.content, media_type=cached_image.media_type, headers=headers)
+
+
+async def get_referenced_filenames() -> Set[str]:
+    filenames = set()
+    for column in IMAGE_URL_COLUMNS:
+        for image_url in await session_context.get().exec(select(column).where(column.is_not(None))):
+            filenames.add(os.path.basename(urlparse(image_url).path))
+
+    return filenames
+
+
+def remove_unreferenced_files(referenced_filenames: Set[str]) -> List[str]:
+    removed_filenames = []
+    expired_before = time.time() - Config.sweep_grace_period
+
+    for entry in os.scandir(Config.directory):
+        if not entry.is_file() or entry.name in referenced_filenames:
+            continue
+
+        if entry.stat().st_mtime < expired_before:
+            os.remove(entry.path)
+            removed_filenames.append(entry.name)
+
+    stems = {
+        os.path.splitext(entry.name)[0]
+        for entry in os.scandir(Config.directory)
+        if entry.is_file()
+    }
+
+    for entry in os.scandir(get_variants_directory()):
+        if entry.name.split('.')[0].split('-')[0] not in stems:
+            os.remove(entry.path)
+
+    return removed_filenames
+
+
+async def sweep_images() -> List[str]:
+    referenced_filenames = await get_referenced_filenames()
+    removed_filenames = await asyncio.to_thread(remove_unreferenced_files, referenced_filenames)
+
+    IMAGE_CACHE.delete_where(lambda key: key[0] in removed_filenames)
+    return removed_filenames
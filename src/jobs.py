@@ -0,0 +1,85 @@
+import asyncio
+import uuid
+from datetime import datetime, timedelta
+from typing import Any, Awaitable, Callable, Dict, Literal, Optional, Tuple
+
+from fastapi import HTTPException
+from pydantic import BaseModel, ConfigDict, Field
+from rewire import logger
+
+
+class Job(BaseModel):
+    model_config = ConfigDict(arbitrary_types_allowed=True)
+
+    id: str = Field(default_factory=lambda: uuid.uuid4().hex)
+    status: Literal['pending', 'running', 'completed', 'failed'] = 'pending'
+    created_at: datetime = Field(default_factory=datetime.now)
+    finished_at: Optional[datetime] = None
+    result: Any = None
+    error: Optional[str] = None
+    error_code: Optional[int] = None
+    done: asyncio.Event = Field(default_factory=asyncio.Event, exclude=True)
+
+    async def wait(self, timeout: Optional[float] = None) -> bool:
+        try:
+            await asyncio.wait_for(self.done.wait(), timeout)
+        except asyncio.TimeoutError:
+            pass
+
+        return self.done.is_set()
+
+
+class JobQueue:
+    def __init__(self, size: int, ttl: int):
+        self.queue: asyncio.Queue[Tuple[Job, Callable[[], Awaitable[Any]]]] = asyncio.Queue(size)
+        self.jobs: Dict[str, Job] = {}
+        self.ttl = timedelta(seconds=ttl)
+
+    def submit(self, task: Callable[[], Awaitable[Any]]) -> Job:
+        self.cleanup()
+
+        job = Job()
+        try:
+            self.queue.put_nowait((job, task))
+        except asyncio.QueueFull:
+            raise HTTPException(503, 'Too many jobs, try again later!')
+
+        self.jobs[job.id] = job
+        return job
+
+    def get(self, job_id: str) -> Optional[Job]:
+        return self.jobs.get(job_id)
+
+    def cleanup(self):
+        expired_before = datetime.now() - self.ttl
+        for job in list(self.jobs.values()):
+            if job.finished_at and job.finished_at < expired_before:
+                del self.jobs[job.id]
+
+    async def run_worker(self):
+        while True:
+            job, task = await self.queue.get()
+            job.status = 'running'
+
+            try:
+                job.result = await task()
+                job.status = 'completed'
+            except HTTPException as e:
+                job.status = 'failed'
+                job.error = e.detail
+                job.error_code = e.status_code
+            except Exception as e:
+                logger.exception(f'Job {job.id} failed: {e}')
+                job.status = 'failed'
+                job.error = 'Internal server error!'
+                job.error_code = 500
+            finally:
+                job.finished_at = datetime.now()
+                job.done.set()
+                self.queue.task_done()
+
+    async def run(self, workers: int):
+        await asyncio.gather(*(
+            self.run_worker()
+            for _ in range(workers)
+        ))
@@ -9,20 +9,25 @@ from maxapi.types import BotStarted, CallbackButton, MessageCallback, MessageCre
 from maxapi.utils.inline_keyboard import InlineKeyboardBuilder
 from pydantic import BaseModel
 from rewire import config, DependenciesModule, logger, simple_plugin
-from rewire_sqlmodel import transaction
+from rewire_sqlmodel import session_context, transaction
 
 from src import auth
 from src.models import User
+from src.ratelimit import TokenBucket
+from src.recipients import update_recipient
 
 
 @config
 class Config(BaseModel):
     token: str
+    rate_limit: float = 30
 
 
 plugin = simple_plugin()
 dispatcher = Dispatcher()
 
+BOT_RATE_LIMITER = TokenBucket(Config.rate_limit)
+
 
 class UnlinkUserCallback(CallbackPayload, prefix='unlink_user'):
     user_id: int
@@ -56,6 +61,10 @@ async def bot_started_handler(event: BotStarted):
     user.max_name = event.from_user.full_name
     user.add()
 
+    await session_context.get().commit()
+    update_recipient(user)
+    auth.invalidate_user(user.id)
+
     await event.bot.send_message(
         event.chat_id,
         text=(
@@ -95,6 +104,10 @@ async def unlink_user_callback(event: MessageCallback, payload: UnlinkUserCallba
     user.max_name = None
     user.add()
 
+    await session_context.get().commit()
+    update_recipient(user)
+    auth.invalidate_user(user.id)
+
     await event.message.answer(
         f'🛑 MAX успешно отвязан от аккаунта <b>«{user.name}»</b>.\n'
         'Вы больше не будете получать уведомления о новых отзывах и жалобах.'
@@ -102,11 +115,15 @@ async def unlink_user_callback(event: MessageCallback, payload: UnlinkUserCallba
     await event.message.delete()
 
 
-async def send_max_message(user_id: int, message_text: str):
+async def send_max_message(user_id: int, message_text: str) -> bool:
+    await BOT_RATE_LIMITER.acquire()
+
     try:
         await get_max_bot().send_message(user_id=user_id, text=message_text)
+        return True
     except MaxApiError as e:
         logger.error(f'Failed to send message to {user_id}: {e}')
+        return False
 
 
 def get_max_bot() -> Bot:
@@ -1,10 +1,13 @@
-from datetime import datetime, time
-from typing import List, Optional, Self
+from datetime import date, datetime, time, timedelta
+from typing import Iterable, List, Optional, Self, Tuple
 
-import bcrypt
 from rewire_sqlmodel import session_context, SQLModel
-from sqlalchemy import update
-from sqlmodel import case, desc, Field, Relationship
+from sqlalchemy import Index, tuple_, update
+from sqlalchemy.dialects.postgresql import insert as postgresql_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlmodel import case, desc, Field, func, Relationship, select
+
+from src import passwords
 
 
 class User(SQLModel, table=True):
@@ -19,12 +22,13 @@ class User(SQLModel, table=True):
     max_name: Optional[str] = None
     telegram_id: Optional[int] = None
     telegram_name: Optional[str] = None
+    token_version: int = 0
 
-    def set_password(self, password: str):
-        self.password_hash = bcrypt.hashpw(password.encode(), bcrypt.gensalt()).decode()
+    async def set_password(self, password: str):
+        self.password_hash = await passwords.hash_password(password)
 
-    def check_password(self, password: str) -> bool:
-        return bcrypt.checkpw(password.encode(), self.password_hash.encode())
+    async def check_password(self, password: str) -> bool:
+        return await passwords.check_password(password, self.password_hash)
 
     @classmethod
     async def get_by_id(cls, user_id: int) -> Optional[Self]:
@@ -198,20 +202,60 @@ class DateModel(SQLModel, table=False):
         return await cls.select().filter_by(id=item_id).first()
 
     @classmethod
-    async def get_all(cls, date_after: Optional[datetime] = None, date_before: Optional[datetime] = None) -> List[Self]:
-        query = cls.select()
+    def filter_between(cls, date_after: Optional[datetime] = None, date_before: Optional[datetime] = None) -> List:
+        filters = []
         if date_after:
             date_after = datetime.combine(date_after, time.min)
-            query = query.where(cls.created_at >= date_after)
+            filters.append(cls.created_at >= date_after)
 
         if date_before:
             date_before = datetime.combine(date_before, time.max)
-            query = query.where(cls.created_at <= date_before)
+            filters.append(cls.created_at <= date_before)
+
+        return filters
+
+    @classmethod
+    def select_between(cls, date_after: Optional[datetime] = None, date_before: Optional[datetime] = None):
+        return cls.select().where(*cls.filter_between(date_after, date_before))
 
+    @classmethod
+    async def get_all(cls, date_after: Optional[datetime] = None, date_before: Optional[datetime] = None) -> List[Self]:
+        query = cls.select_between(date_after, date_before)
         return list(await query.order_by(cls.created_at).all())
 
+    @classmethod
+    async def count_between(cls, date_after: Optional[datetime] = None, date_before: Optional[datetime] = None) -> int:
+        query = select(func.count()).select_from(cls).where(*cls.filter_between(date_after, date_before))
+        return (await session_context.get().exec(query)).one()
+
+    @classmethod
+    def select_page(
+            cls,
+            date_after: Optional[datetime] = None,
+            date_before: Optional[datetime] = None,
+            cursor: Optional[Tuple[datetime, int]] = None,
+            limit: int = 50
+    ):
+        query = cls.select_between(date_after, date_before)
+        if cursor:
+            query = query.where(tuple_(cls.created_at, cls.id) > tuple_(*cursor))
+
+        return query.order_by(cls.created_at, cls.id).limit(limit)
+
+    @classmethod
+    async def get_page(
+            cls,
+            date_after: Optional[datetime] = None,
+            date_before: Optional[datetime] = None,
+            cursor: Optional[Tuple[datetime, int]] = None,
+            limit: int = 50
+    ) -> List[Self]:
+        return list(await cls.select_page(date_after, date_before, cursor, limit).all())
+
 
 class Review(DateModel, table=True):
+    __table_args__ = (Index('ix_review_created_at_id', 'created_at', 'id'),)
+
     contact_name: Optional[str] = None
     contact_phone: Optional[str] = None
     review_text: Optional[str] = None
@@ -248,6 +292,8 @@ class Review(DateModel, table=True):
 
 
 class Complaint(DateModel, table=True):
+    __table_args__ = (Index('ix_complaint_created_at_id', 'created_at', 'id'),)
+
     contact_name: Optional[str] = None
     contact_phone: Optional[str] = None
     complaint_text: Optional[str] = None
@@ -256,3 +302,76 @@ class Complaint(DateModel, table=True):
         link_model=ComplaintReasonLink,
         sa_relationship_kwargs={'lazy': 'selectin'}
     )
+
+
+class Notification(DateModel, table=True):
+    platform: str
+    chat_id: int
+    message_text: str
+    attempts: int = 0
+    next_attempt_at: datetime = Field(default_factory=datetime.now, index=True)
+    sent_at: Optional[datetime] = None
+
+    @classmethod
+    async def claim_pending(cls, limit: int, max_attempts: int, lease: timedelta) -> List[Self]:
+        query = (
+            select(cls)
+            .where(cls.sent_at.is_(None))
+            .where(cls.attempts < max_attempts)
+            .where(cls.next_attempt_at <= datetime.now())
+            .order_by(cls.next_attempt_at)
+            .limit(limit)
+        )
+
+        session = session_context.get()
+        connection = await session.connection()
+        if connection.dialect.name != 'sqlite':
+            query = query.with_for_update(skip_locked=True)
+
+        notifications = list((await session.exec(query)).all())
+        for notification in notifications:
+            notification.attempts += 1
+            notification.next_attempt_at = datetime.now() + lease
+            notification.add()
+
+        return notifications
+
+
+class DailyStat(SQLModel, table=True):
+    day: date = Field(primary_key=True)
+    kind: str = Field(primary_key=True)
+    item_id: int = Field(default=0, primary_key=True)
+    total: int = 0
+
+    @classmethod
+    async def increment(cls, day: date, kind: str, item_ids: Iterable[int], delta: int = 1):
+        values = [
+            {'day': day, 'kind': kind, 'item_id': item_id, 'total': delta}
+            for item_id in item_ids
+        ]
+
+        if not values:
+            return
+
+        session = session_context.get()
+        connection = await session.connection()
+        insert = sqlite_insert if connection.dialect.name == 'sqlite' else postgresql_insert
+
+        query = insert(cls).values(values)
+        query = query.on_conflict_do_update(
+            index_elements=[cls.day, cls.kind, cls.item_id],
+            set_={'total': cls.total + query.excluded.total}
+        )
+
+        await session.exec(query)
+
+    @classmethod
+    async def get_between(cls, date_after: Optional[datetime] = None, date_before: Optional[datetime] = None) -> List[Self]:
+        query = cls.select().where(cls.total != 0)
+        if date_after:
+            query = query.where(cls.day >= date_after.date())
+
+        if date_before:
+            query = query.where(cls.day <= date_before.date())
+
+        return list(await query.order_by(cls.day).all())
@@ -0,0 +1,95 @@
+import asyncio
+from datetime import datetime, timedelta
+from typing import List
+
+from pydantic import BaseModel
+from rewire import config, logger, simple_plugin
+from rewire_sqlmodel import transaction
+
+from src.max import send_max_message
+from src.models import Notification
+from src.recipients import get_recipients
+from src.telegram import send_telegram_message
+
+
+@config
+class Config(BaseModel):
+    batch_size: int = 50
+    poll_interval: float = 2
+    lease: float = 60
+    max_attempts: int = 8
+    retry_delay: float = 5
+    max_retry_delay: float = 3600
+
+
+plugin = simple_plugin()
+
+SENDERS = {
+    'max': send_max_message,
+    'telegram': send_telegram_message,
+}
+
+
+async def add_alert_notifications(message_text: str):
+    for recipient in await get_recipients():
+        if recipient.max_id:
+            Notification(platform='max', chat_id=recipient.max_id, message_text=message_text).add()
+
+        if recipient.telegram_id:
+            Notification(platform='telegram', chat_id=recipient.telegram_id, message_text=message_text).add()
+
+
+@transaction(1)
+async def claim_notifications() -> List[Notification]:
+    return await Notification.claim_pending(
+        limit=Config.batch_size,
+        max_attempts=Config.max_attempts,
+        lease=timedelta(seconds=Config.lease)
+    )
+
+
+@transaction(1)
+async def complete_notifications(notifications: List[Notification], results: List[bool]):
+    for notification, is_sent in zip(notifications, results):
+        if is_sent:
+            notification.sent_at = datetime.now()
+        else:
+            retry_delay = min(Config.retry_delay * 2 ** (notification.attempts - 1), Config.max_retry_delay)
+            notification.next_attempt_at = datetime.now() + timedelta(seconds=retry_delay)
+
+        notification.add()
+
+
+async def deliver_notification(notification: Notification) -> bool:
+    # A sender raising must not abort the batch, or already delivered messages would be sent again after the lease
+    try:
+        return await SENDERS[notification.platform](notification.chat_id, notification.message_text)
+    except Exception as e:
+        logger.exception(f'Failed to deliver notification {notification.id}: {e}')
+        return False
+
+
+async def process_notifications() -> bool:
+    notifications = await claim_notifications()
+    if not notifications:
+        return False
+
+    results = await asyncio.gather(*(
+        deliver_notification(notification)
+        for notification in notifications
+    ))
+
+    await complete_notifications(notifications, list(results))
+    return True
+
+
+@plugin.run()
+async def run_outbox_worker():
+    while True:
+        try:
+            if await process_notifications():
+                continue
+        except Exception as e:
+            logger.exception(f'Failed to process notifications: {e}')
+
+        await asyncio.sleep(Config.poll_interval)
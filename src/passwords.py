@@ -0,0 +1,43 @@
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+
+import bcrypt
+from pydantic import BaseModel
+from rewire import config
+
+
+@config
+class Config(BaseModel):
+    rounds: int = 12
+    workers: int = 2
+
+
+EXECUTOR = ThreadPoolExecutor(max_workers=Config.workers, thread_name_prefix='bcrypt')
+
+
+def get_rounds(password_hash: str) -> int:
+    return int(password_hash.split('$')[2])
+
+
+def needs_rehash(password_hash: str) -> bool:
+    return get_rounds(password_hash) != Config.rounds
+
+
+async def hash_password(password: str) -> str:
+    password_hash = await asyncio.get_running_loop().run_in_executor(
+        EXECUTOR,
+        bcrypt.hashpw,
+        password.encode(),
+        bcrypt.gensalt(Config.rounds)
+    )
+
+    return password_hash.decode()
+
+
+async def check_password(password: str, password_hash: str) -> bool:
+    return await asyncio.get_running_loop().run_in_executor(
+        EXECUTOR,
+        bcrypt.checkpw,
+        password.encode(),
+        password_hash.encode()
+    )
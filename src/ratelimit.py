@@ -0,0 +1,92 @@
+import asyncio
+import time
+from collections import defaultdict, deque
+from typing import DefaultDict, Deque, Dict, Hashable, List, Optional, Protocol
+
+
+class TokenBucket:
+    def __init__(self, rate: float, capacity: Optional[float] = None):
+        self.rate = rate
+        self.capacity = capacity or rate
+        self.tokens = self.capacity
+        self.updated_at = time.monotonic()
+        self.lock = asyncio.Lock()
+
+    def refill(self):
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated_at) * self.rate)
+        self.updated_at = now
+
+    async def acquire(self):
+        async with self.lock:
+            self.refill()
+            while self.tokens < 1:
+                await asyncio.sleep((1 - self.tokens) / self.rate)
+                self.refill()
+
+            self.tokens -= 1
+
+
+class KeyedTokenBucket:
+    def __init__(self, rate: float, capacity: Optional[float] = None):
+        self.buckets: DefaultDict[Hashable, TokenBucket] = defaultdict(lambda: TokenBucket(rate, capacity))
+
+    async def acquire(self, key: Hashable):
+        await self.buckets[key].acquire()
+
+
+class SlidingWindowBackend(Protocol):
+    async def get_hits(self, key: str, window: float) -> List[float]:
+        ...
+
+    async def add_hit(self, key: str, timestamp: float):
+        ...
+
+    async def reset(self, key: str):
+        ...
+
+
+class MemorySlidingWindowBackend:
+    def __init__(self, max_keys: int = 10000):
+        self.max_keys = max_keys
+        self.hits: Dict[str, Deque[float]] = {}
+
+    async def get_hits(self, key: str, window: float) -> List[float]:
+        hits = self.hits.get(key)
+        if not hits:
+            return []
+
+        expired_before = time.time() - window
+        while hits and hits[0] <= expired_before:
+            hits.popleft()
+
+        return list(hits)
+
+    async def add_hit(self, key: str, timestamp: float):
+        if key not in self.hits and len(self.hits) >= self.max_keys:
+            self.hits.pop(next(iter(self.hits)))
+
+        self.hits.setdefault(key, deque()).append(timestamp)
+
+    async def reset(self, key: str):
+        self.hits.pop(key, None)
+
+
+class SlidingWindowLimiter:
+    def __init__(self, limit: int, window: float, backend: Optional[SlidingWindowBackend] = None):
+        self.limit = limit
+        self.window = window
+        self.backend = backend or MemorySlidingWindowBackend()
+
+    async def get_retry_after(self, key: str) -> Optional[float]:
+        hits = await self.backend.get_hits(key, self.window)
+        if len(hits) < self.limit:
+            return None
+
+        return hits[-self.limit] + self.window - time.time()
+
+    async def hit(self, key: str):
+        await self.backend.add_hit(key, time.time())
+
+    async def reset(self, key: str):
+        await self.backend.reset(key)
@@ -0,0 +1,39 @@
+import asyncio
+from typing import Dict, List, Optional
+
+from pydantic import BaseModel
+
+from src.models import User
+
+
+class Recipient(BaseModel):
+    max_id: Optional[int]
+    telegram_id: Optional[int]
+
+
+RECIPIENTS: Optional[Dict[int, Recipient]] = None
+LOCK = asyncio.Lock()
+
+
+async def get_recipients() -> List[Recipient]:
+    global RECIPIENTS
+
+    if RECIPIENTS is None:
+        async with LOCK:
+            if RECIPIENTS is None:
+                RECIPIENTS = {
+                    user.id: Recipient(max_id=user.max_id, telegram_id=user.telegram_id)
+                    for user in await User.get_all()
+                }
+
+    return list(RECIPIENTS.values())
+
+
+def update_recipient(user: User):
+    if RECIPIENTS is not None:
+        RECIPIENTS[user.id] = Recipient(max_id=user.max_id, telegram_id=user.telegram_id)
+
+
+def remove_recipient(user_id: int):
+    if RECIPIENTS is not None:
+        RECIPIENTS.pop(user_id, None)
@@ -4,10 +4,11 @@ from fastapi import APIRouter, Depends, FastAPI, HTTPException
 from rewire import simple_plugin
 from rewire_sqlmodel import session_context, transaction
 
-from src import chatgpt
+from src import auth, catalog, chatgpt, images, stats
 from src.auth import admin_required, owner_required
 from src.models import Aspect, Doctor, News, Platform, Prompt, Reason, Reward, Service, Source, User
-from src.schemas import AspectRequest, AspectResponse, create_doctor_response, DoctorRequest, DoctorResponse, NewsRequest, NewsResponse, PlatformRequest, PlatformResponse, PromptRequest, PromptResponse, PromptTestResponse, ReasonRequest, ReasonResponse, ReorderRequest, RewardRequest, RewardResponse, ServiceRequest, ServiceResponse, SourceRequest, SourceResponse, UserRequest, UserResponse
+from src.recipients import remove_recipient, update_recipient
+from src.schemas import AspectRequest, AspectResponse, create_doctor_response, DoctorRequest, DoctorResponse, NewsRequest, NewsResponse, PlatformRequest, PlatformResponse, PromptRequest, PromptResponse, PromptTestResponse, ReasonRequest, ReasonResponse, ReorderRequest, RewardRequest, RewardResponse, ServiceRequest, ServiceResponse, SourceRequest, SourceResponse, SweepImagesResponse, UserRequest, UserResponse
 
 plugin = simple_plugin()
 router = APIRouter(
@@ -30,10 +31,11 @@ async def get_users() -> List[UserResponse]:
 @transaction(1)
 async def create_user(request: UserRequest) -> UserResponse:
     user = User(**request.model_dump())
-    user.set_password(request.password)
+    await user.set_password(request.password)
     user.add()
 
     await session_context.get().commit()
+    update_recipient(user)
     return UserResponse(**user.model_dump())
 
 
@@ -44,12 +46,19 @@ async def update_user(user_id: int, request: UserRequest) -> UserResponse:
     if not user:
         raise HTTPException(404, 'User not found!')
 
+    if request.password or request.is_admin != user.is_admin:
+        auth.revoke_tokens(user)
+
     if request.password:
-        user.set_password(request.password)
+        await user.set_password(request.password)
 
     user.sqlmodel_update(request.model_dump())
     user.add()
 
+    await session_context.get().commit()
+    update_recipient(user)
+    auth.invalidate_user(user.id)
+
     return UserResponse(**user.model_dump())
 
 
@@ -60,10 +69,16 @@ async def delete_user(user_id: int):
     if not user:
         raise HTTPException(404, 'User not found!')
 
+    auth.revoke_tokens(user)
     await user.delete()
 
+    await session_context.get().commit()
+    remove_recipient(user_id)
+    auth.invalidate_user(user_id)
+
 
 @router.post('/doctors')
+@catalog.invalidates(Doctor)
 @transaction(1)
 async def create_doctor(request: DoctorRequest) -> DoctorResponse:
     services = await Service.get_by_ids(request.service_ids)
@@ -75,6 +90,7 @@ async def create_doctor(request: DoctorRequest) -> DoctorResponse:
 
 
 @router.post('/doctors/{doctor_id}')
+@catalog.invalidates(Doctor)
 @transaction(1)
 async def update_doctor(doctor_id: int, request: DoctorRequest) -> DoctorResponse:
     doctor = await Doctor.get_by_id(doctor_id)
@@ -90,6 +106,7 @@ async def update_doctor(doctor_id: int, request: DoctorRequest) -> DoctorRespons
 
 
 @router.delete('/doctors/{doctor_id}', status_code=204)
+@catalog.invalidates(Doctor)
 @transaction(1)
 async def delete_doctor(doctor_id: int):
     doctor = await Doctor.get_by_id(doctor_id)
@@ -100,12 +117,14 @@ async def delete_doctor(doctor_id: int):
 
 
 @router.patch('/doctors/reorder', status_code=204)
+@catalog.invalidates(Doctor)
 @transaction(1)
 async def reorder_doctors(request: ReorderRequest):
     await Doctor.reorder(request.ordered_ids)
 
 
 @router.post('/services')
+@catalog.invalidates(Service)
 @transaction(1)
 async def create_service(request: ServiceRequest) -> ServiceResponse:
     service = Service(**request.model_dump())
@@ -116,6 +135,7 @@ async def create_service(request: ServiceRequest) -> ServiceResponse:
 
 
 @router.post('/services/{service_id}')
+@catalog.invalidates(Service)
 @transaction(1)
 async def update_service(service_id: int, request: ServiceRequest) -> ServiceResponse:
     service = await Service.get_by_id(service_id)
@@ -129,6 +149,7 @@ async def update_service(service_id: int, request: ServiceRequest) -> ServiceRes
 
 
 @router.delete('/services/{service_id}', status_code=204)
+@catalog.invalidates(Service)
 @transaction(1)
 async def delete_service(service_id: int):
     service = await Service.get_by_id(service_id)
@@ -139,12 +160,14 @@ async def delete_service(service_id: int):
 
 
 @router.patch('/services/reorder', status_code=204)
+@catalog.invalidates(Service)
 @transaction(1)
 async def reorder_services(request: ReorderRequest):
     await Service.reorder(request.ordered_ids)
 
 
 @router.post('/aspects')
+@catalog.invalidates(Aspect)
 @transaction(1)
 async def create_aspect(request: AspectRequest) -> AspectResponse:
     aspect = Aspect(**request.model_dump())
@@ -155,6 +178,7 @@ async def create_aspect(request: AspectRequest) -> AspectResponse:
 
 
 @router.post('/aspects/{aspect_id}')
+@catalog.invalidates(Aspect)
 @transaction(1)
 async def update_aspect(aspect_id: int, request: AspectRequest) -> AspectResponse:
     aspect = await Aspect.get_by_id(aspect_id)
@@ -168,6 +192,7 @@ async def update_aspect(aspect_id: int, request: AspectRequest) -> AspectRespons
 
 
 @router.delete('/aspects/{aspect_id}', status_code=204)
+@catalog.invalidates(Aspect)
 @transaction(1)
 async def delete_aspect(aspect_id: int):
     aspect = await Aspect.get_by_id(aspect_id)
@@ -178,12 +203,14 @@ async def delete_aspect(aspect_id: int):
 
 
 @router.patch('/aspects/reorder', status_code=204)
+@catalog.invalidates(Aspect)
 @transaction(1)
 async def reorder_aspects(request: ReorderRequest):
     await Aspect.reorder(request.ordered_ids)
 
 
 @router.post('/sources')
+@catalog.invalidates(Source)
 @transaction(1)
 async def create_source(request: SourceRequest) -> SourceResponse:
     source = Source(**request.model_dump())
@@ -194,6 +221,7 @@ async def create_source(request: SourceRequest) -> SourceResponse:
 
 
 @router.post('/sources/{source_id}')
+@catalog.invalidates(Source)
 @transaction(1)
 async def update_source(source_id: int, request: SourceRequest) -> SourceResponse:
     source = await Source.get_by_id(source_id)
@@ -207,6 +235,7 @@ async def update_source(source_id: int, request: SourceRequest) -> SourceRespons
 
 
 @router.delete('/sources/{source_id}', status_code=204)
+@catalog.invalidates(Source)
 @transaction(1)
 async def delete_source(source_id: int):
     source = await Source.get_by_id(source_id)
@@ -217,12 +246,14 @@ async def delete_source(source_id: int):
 
 
 @router.patch('/sources/reorder', status_code=204)
+@catalog.invalidates(Source)
 @transaction(1)
 async def reorder_sources(request: ReorderRequest):
     await Source.reorder(request.ordered_ids)
 
 
 @router.post('/rewards')
+@catalog.invalidates(Reward)
 @transaction(1)
 async def create_reward(request: RewardRequest) -> RewardResponse:
     reward = Reward(**request.model_dump())
@@ -233,6 +264,7 @@ async def create_reward(request: RewardRequest) -> RewardResponse:
 
 
 @router.post('/rewards/{reward_id}')
+@catalog.invalidates(Reward)
 @transaction(1)
 async def update_reward(reward_id: int, request: RewardRequest) -> RewardResponse:
     reward = await Reward.get_by_id(reward_id)
@@ -246,6 +278,7 @@ async def update_reward(reward_id: int, request: RewardRequest) -> RewardRespons
 
 
 @router.delete('/rewards/{reward_id}', status_code=204)
+@catalog.invalidates(Reward)
 @transaction(1)
 async def delete_reward(reward_id: int):
     reward = await Reward.get_by_id(reward_id)
@@ -256,12 +289,14 @@ async def delete_reward(reward_id: int):
 
 
 @router.patch('/rewards/reorder', status_code=204)
+@catalog.invalidates(Reward)
 @transaction(1)
 async def reorder_rewards(request: ReorderRequest):
     await Reward.reorder(request.ordered_ids)
 
 
 @router.post('/platforms')
+@catalog.invalidates(Platform)
 @transaction(1)
 async def create_platform(request: PlatformRequest) -> PlatformResponse:
     platform = Platform(**request.model_dump())
@@ -272,6 +307,7 @@ async def create_platform(request: PlatformRequest) -> PlatformResponse:
 
 
 @router.post('/platforms/{platform_id}')
+@catalog.invalidates(Platform)
 @transaction(1)
 async def update_platform(platform_id: int, request: PlatformRequest) -> PlatformResponse:
     platform = await Platform.get_by_id(platform_id)
@@ -285,6 +321,7 @@ async def update_platform(platform_id: int, request: PlatformRequest) -> Platfor
 
 
 @router.delete('/platforms/{platform_id}', status_code=204)
+@catalog.invalidates(Platform)
 @transaction(1)
 async def delete_platform(platform_id: int):
     platform = await Platform.get_by_id(platform_id)
@@ -295,12 +332,14 @@ async def delete_platform(platform_id: int):
 
 
 @router.patch('/platforms/reorder', status_code=204)
+@catalog.invalidates(Platform)
 @transaction(1)
 async def reorder_platforms(request: ReorderRequest):
     await Platform.reorder(request.ordered_ids)
 
 
 @router.post('/reasons')
+@catalog.invalidates(Reason)
 @transaction(1)
 async def create_reason(request: ReasonRequest) -> ReasonResponse:
     reason = Reason(**request.model_dump())
@@ -311,6 +350,7 @@ async def create_reason(request: ReasonRequest) -> ReasonResponse:
 
 
 @router.post('/reasons/{reason_id}')
+@catalog.invalidates(Reason)
 @transaction(1)
 async def update_reason(reason_id: int, request: ReasonRequest) -> ReasonResponse:
     reason = await Reason.get_by_id(reason_id)
@@ -324,6 +364,7 @@ async def update_reason(reason_id: int, request: ReasonRequest) -> ReasonRespons
 
 
 @router.delete('/reasons/{reason_id}', status_code=204)
+@catalog.invalidates(Reason)
 @transaction(1)
 async def delete_reason(reason_id: int):
     reason = await Reason.get_by_id(reason_id)
@@ -334,12 +375,14 @@ async def delete_reason(reason_id: int):
 
 
 @router.patch('/reasons/reorder', status_code=204)
+@catalog.invalidates(Reason)
 @transaction(1)
 async def reorder_reasons(request: ReorderRequest):
     await Reason.reorder(request.ordered_ids)
 
 
 @router.post('/news')
+@catalog.invalidates(News)
 @transaction(1)
 async def create_news(request: NewsRequest) -> NewsResponse:
     news = News(**request.model_dump())
@@ -350,6 +393,7 @@ async def create_news(request: NewsRequest) -> NewsResponse:
 
 
 @router.post('/news/{news_id}')
+@catalog.invalidates(News)
 @transaction(1)
 async def update_news(news_id: int, request: NewsRequest) -> NewsResponse:
     news = await News.get_by_id(news_id)
@@ -363,6 +407,7 @@ async def update_news(news_id: int, request: NewsRequest) -> NewsResponse:
 
 
 @router.delete('/news/{news_id}', status_code=204)
+@catalog.invalidates(News)
 @transaction(1)
 async def delete_news(news_id: int):
     news = await News.get_by_id(news_id)
@@ -373,6 +418,7 @@ async def delete_news(news_id: int):
 
 
 @router.patch('/news/reorder', status_code=204)
+@catalog.invalidates(News)
 @transaction(1)
 async def reorder_news(request: ReorderRequest):
     await News.reorder(request.ordered_ids)
@@ -424,6 +470,18 @@ async def test_prompt(request: PromptRequest) -> PromptTestResponse:
     return PromptTestResponse(generated_text=generated_text)
 
 
+@router.post('/stats/rebuild', status_code=204)
+@transaction(1)
+async def rebuild_stats():
+    await stats.rebuild_daily_stats()
+
+
+@router.post('/images/sweep')
+@transaction(1)
+async def sweep_images() -> SweepImagesResponse:
+    return SweepImagesResponse(removed_filenames=await images.sweep_images())
+
+
 @plugin.setup()
 def include_router(app: FastAPI):
     app.include_router(router)
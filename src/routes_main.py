@@ -1,24 +1,22 @@
 import os
-import uuid
 from datetime import datetime
-from io import BytesIO
 from typing import List, Optional
 
-import aiofiles
 from aiogram.utils.deep_linking import create_start_link
 from fastapi import APIRouter, Depends, FastAPI, File, HTTPException, Query, UploadFile
 from rewire import simple_plugin
 from rewire_sqlmodel import session_context, transaction
 from starlette.requests import Request
-from starlette.responses import FileResponse, StreamingResponse
+from starlette.responses import FileResponse, JSONResponse, Response
 
-from src import auth
+from src import auth, catalog, exports, images, passwords, stats
 from src.auth import user_required
 from src.max import get_max_bot
+from src.recipients import update_recipient
 from src.models import Aspect, Complaint, Doctor, News, Platform, Reason, Review, Reward, Service, Source, User
-from src.schemas import AspectResponse, create_complaint_response, create_doctor_response, create_review_response, DoctorResponse, LoginRequest, LoginResponse, NewsResponse, PlatformResponse, ReasonResponse, ResetPasswordRequest, ReviewsDashboardResponse, RewardResponse, ServiceResponse, SourceResponse, StartLinkResponse, UploadImageResponse, UserRequest, UserResponse
+from src.schemas import AspectResponse, CatalogResponse, ComplaintsPageResponse, create_complaint_response, create_export_job_response, create_review_response, DashboardStatsResponse, DoctorResponse, ExportJobResponse, LoginRequest, LoginResponse, NewsResponse, PlatformResponse, ReasonResponse, RefreshTokenRequest, ResetPasswordRequest, ReviewsDashboardResponse, ReviewsPageResponse, RewardResponse, ServiceResponse, SourceResponse, StartLinkResponse, TokenResponse, UploadImageResponse, UserRequest, UserResponse
 from src.telegram import get_telegram_bot
-from src.utils import export_rows_to_excel
+from src.utils import decode_cursor, encode_cursor
 
 plugin = simple_plugin()
 router = APIRouter(prefix='/api', tags=['Main'])
@@ -26,14 +24,42 @@ router = APIRouter(prefix='/api', tags=['Main'])
 
 @router.post('/login')
 @transaction(1)
-async def login(request: LoginRequest) -> LoginResponse:
+async def login(request: LoginRequest, http_request: Request) -> LoginResponse:
+    await auth.check_login_attempt(auth.get_client_ip(http_request), request.username)
+
     user = await User.get_by_username(request.username)
-    if not user or not user.check_password(request.password):
+    if not user or not await user.check_password(request.password):
+        await auth.record_login_failure(request.username)
         raise HTTPException(401, 'Invalid username or password!')
 
+    await auth.record_login_success(request.username)
+
+    if passwords.needs_rehash(user.password_hash):
+        await user.set_password(request.password)
+        user.add()
+
+        await session_context.get().commit()
+        auth.invalidate_user(user.id)
+
     return LoginResponse(
         user=UserResponse(**user.model_dump()),
-        access_token=auth.generate_access_token(user.id)
+        access_token=auth.generate_access_token(user),
+        refresh_token=auth.generate_refresh_token(user)
+    )
+
+
+@router.post('/token/refresh')
+@transaction(1)
+async def refresh_token(request: RefreshTokenRequest) -> TokenResponse:
+    claims = await auth.verify_token(request.refresh_token, 'refresh')
+
+    user = await auth.get_cached_user(claims.user_id)
+    if not user:
+        raise HTTPException(401, 'Unknown user!')
+
+    return TokenResponse(
+        access_token=auth.generate_access_token(user),
+        refresh_token=auth.generate_refresh_token(user)
     )
 
 
@@ -46,22 +72,35 @@ async def get_current_user(user: User = Depends(user_required)) -> UserResponse:
 @router.post('/user/update')
 @transaction(1)
 async def update_current_user(request: UserRequest, user: User = Depends(user_required)) -> UserResponse:
+    if request.is_admin != user.is_admin:
+        auth.revoke_tokens(user)
+
     user.sqlmodel_update(request.model_dump())
     user.add()
 
     await session_context.get().commit()
+    auth.invalidate_user(user.id)
     return UserResponse(**user.model_dump())
 
 
-@router.post('/password/reset', status_code=204)
+@router.post('/password/reset')
 @transaction(1)
-async def reset_password(request: ResetPasswordRequest, user: User = Depends(user_required)):
-    if not user.check_password(request.password):
+async def reset_password(request: ResetPasswordRequest, user: User = Depends(user_required)) -> TokenResponse:
+    if not await user.check_password(request.password):
         raise HTTPException(401, 'Invalid password!')
 
-    user.set_password(request.new_password)
+    await user.set_password(request.new_password)
+    auth.revoke_tokens(user)
     user.add()
 
+    await session_context.get().commit()
+    auth.invalidate_user(user.id)
+
+    return TokenResponse(
+        access_token=auth.generate_access_token(user),
+        refresh_token=auth.generate_refresh_token(user)
+    )
+
 
 @router.get('/max/link')
 @transaction(1)
@@ -77,6 +116,10 @@ async def unlink_max(user: User = Depends(user_required)):
     user.max_name = None
     user.add()
 
+    await session_context.get().commit()
+    update_recipient(user)
+    auth.invalidate_user(user.id)
+
 
 @router.get('/telegram/link')
 @transaction(1)
@@ -92,23 +135,24 @@ async def unlink_telegram(user: User = Depends(user_required)):
     user.telegram_name = None
     user.add()
 
+    await session_context.get().commit()
+    update_recipient(user)
+    auth.invalidate_user(user.id)
 
-@router.get('/doctors')
-@transaction(1)
-async def get_doctors() -> List[DoctorResponse]:
-    return [
-        create_doctor_response(doctor)
-        for doctor in await Doctor.get_all()
-    ]
 
+@router.get('/catalog', response_model=CatalogResponse)
+async def get_catalog(request: Request) -> Response:
+    return await catalog.create_catalog_response(request)
+
+
+@router.get('/doctors', response_model=List[DoctorResponse])
+async def get_doctors(request: Request) -> Response:
+    return await catalog.create_items_response(request, Doctor)
 
-@router.get('/services')
-@transaction(1)
-async def get_services() -> List[ServiceResponse]:
-    return [
-        ServiceResponse(**service.model_dump())
-        for service in await Service.get_all()
-    ]
+
+@router.get('/services', response_model=List[ServiceResponse])
+async def get_services(request: Request) -> Response:
+    return await catalog.create_items_response(request, Service)
 
 
 @router.get('/services/doctors')
@@ -120,58 +164,34 @@ async def get_services_by_doctor_ids(doctor_ids: List[int] = Query(...)) -> List
     ]
 
 
-@router.get('/aspects')
-@transaction(1)
-async def get_aspects() -> List[AspectResponse]:
-    return [
-        AspectResponse(**aspect.model_dump())
-        for aspect in await Aspect.get_all()
-    ]
+@router.get('/aspects', response_model=List[AspectResponse])
+async def get_aspects(request: Request) -> Response:
+    return await catalog.create_items_response(request, Aspect)
 
 
-@router.get('/sources')
-@transaction(1)
-async def get_sources() -> List[SourceResponse]:
-    return [
-        SourceResponse(**source.model_dump())
-        for source in await Source.get_all()
-    ]
+@router.get('/sources', response_model=List[SourceResponse])
+async def get_sources(request: Request) -> Response:
+    return await catalog.create_items_response(request, Source)
 
 
-@router.get('/rewards')
-@transaction(1)
-async def get_rewards() -> List[RewardResponse]:
-    return [
-        RewardResponse(**reward.model_dump())
-        for reward in await Reward.get_all()
-    ]
+@router.get('/rewards', response_model=List[RewardResponse])
+async def get_rewards(request: Request) -> Response:
+    return await catalog.create_items_response(request, Reward)
 
 
-@router.get('/platforms')
-@transaction(1)
-async def get_platforms() -> List[PlatformResponse]:
-    return [
-        PlatformResponse(**platform.model_dump())
-        for platform in await Platform.get_all()
-    ]
+@router.get('/platforms', response_model=List[PlatformResponse])
+async def get_platforms(request: Request) -> Response:
+    return await catalog.create_items_response(request, Platform)
 
 
-@router.get('/reasons')
-@transaction(1)
-async def get_reasons() -> List[ReasonResponse]:
-    return [
-        ReasonResponse(**reason.model_dump())
-        for reason in await Reason.get_all()
-    ]
+@router.get('/reasons', response_model=List[ReasonResponse])
+async def get_reasons(request: Request) -> Response:
+    return await catalog.create_items_response(request, Reason)
 
 
-@router.get('/news')
-@transaction(1)
-async def get_news() -> List[NewsResponse]:
-    return [
-        NewsResponse(**news.model_dump())
-        for news in await News.get_all()
-    ]
+@router.get('/news', response_model=List[NewsResponse])
+async def get_news(request: Request) -> Response:
+    return await catalog.create_items_response(request, News)
 
 
 @router.get('/owner')
@@ -196,63 +216,119 @@ async def get_dashboard(date_after: Optional[datetime] = None, date_before: Opti
     )
 
 
-@router.get('/export/reviews', dependencies=[Depends(user_required)])
+@router.get('/dashboard/reviews', dependencies=[Depends(user_required)])
 @transaction(1)
-async def export_reviews_file(date_after: Optional[datetime] = None, date_before: Optional[datetime] = None) -> StreamingResponse:
-    rows_data = []
-    for review in await Review.get_all(date_after, date_before):
-        doctors_text = ', '.join(doctor.name for doctor in review.selected_doctors)
-        services_text = ', '.join(service.name for service in review.selected_services)
-        platforms_text = ', '.join(platform.name for platform in review.published_platforms)
-        rows_data.append({
-            'Пациент': review.contact_name,
-            'Телефон': review.contact_phone,
-            'Врач': doctors_text,
-            'Услуга': services_text,
-            'Подарок': review.selected_reward.name if review.selected_reward else None,
-            'Платформы': platforms_text,
-            'Текст отзыва': review.review_text,
-        })
-
-    excel_bytes = export_rows_to_excel(rows_data)
-    return StreamingResponse(
-        BytesIO(excel_bytes),
-        media_type='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
+async def get_dashboard_reviews(
+        date_after: Optional[datetime] = None,
+        date_before: Optional[datetime] = None,
+        cursor: Optional[str] = None,
+        limit: int = Query(50, ge=1, le=200)
+) -> ReviewsPageResponse:
+    reviews = await Review.get_page(date_after, date_before, decode_cursor(cursor) if cursor else None, limit + 1)
+    return ReviewsPageResponse(
+        reviews=[create_review_response(review) for review in reviews[:limit]],
+        next_cursor=encode_cursor(reviews[limit - 1]) if len(reviews) > limit else None
     )
 
 
-@router.get('/export/complaints', dependencies=[Depends(user_required)])
+@router.get('/dashboard/complaints', dependencies=[Depends(user_required)])
 @transaction(1)
-async def export_complaints_file(date_after: Optional[datetime] = None, date_before: Optional[datetime] = None) -> StreamingResponse:
-    rows_data = []
-    for complaint in await Complaint.get_all(date_after, date_before):
-        reasons_text = ', '.join(reason.name for reason in complaint.selected_reasons)
-        rows_data.append({
-            'Пациент': complaint.contact_name,
-            'Телефон': complaint.contact_phone,
-            'Причины': reasons_text,
-            'Текст жалобы': complaint.complaint_text,
-        })
-
-    excel_bytes = export_rows_to_excel(rows_data)
-    return StreamingResponse(
-        BytesIO(excel_bytes),
-        media_type='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
+async def get_dashboard_complaints(
+        date_after: Optional[datetime] = None,
+        date_before: Optional[datetime] = None,
+        cursor: Optional[str] = None,
+        limit: int = Query(50, ge=1, le=200)
+) -> ComplaintsPageResponse:
+    complaints = await Complaint.get_page(date_after, date_before, decode_cursor(cursor) if cursor else None, limit + 1)
+    return ComplaintsPageResponse(
+        complaints=[create_complaint_response(complaint) for complaint in complaints[:limit]],
+        next_cursor=encode_cursor(complaints[limit - 1]) if len(complaints) > limit else None
     )
 
 
-@router.post('/images/upload', dependencies=[Depends(user_required)])
+@router.get('/dashboard/stats', dependencies=[Depends(user_required)])
 @transaction(1)
-async def upload_image_file(request: Request, file: UploadFile = File(...)) -> UploadImageResponse:
-    if not file.content_type.startswith('image/'):
-        raise HTTPException(status_code=400, detail='Only image files are allowed!')
+async def get_dashboard_stats(date_after: Optional[datetime] = None, date_before: Optional[datetime] = None) -> DashboardStatsResponse:
+    return await stats.get_dashboard_stats(date_after, date_before)
+
+
+@router.get('/export/reviews', dependencies=[Depends(user_required)])
+@transaction(1)
+async def export_reviews_file(
+        request: Request,
+        date_after: Optional[datetime] = None,
+        date_before: Optional[datetime] = None,
+        export_format: exports.ExportFormat = Query('xlsx', alias='format')
+) -> Response:
+    if await exports.requires_export_job(Review, export_format, date_after, date_before):
+        job = exports.submit_export(lambda: exports.stream_review_rows(date_after, date_before), exports.REVIEW_COLUMNS, export_format)
+        return JSONResponse(create_export_job_response(job, str(request.base_url).rstrip('/')).model_dump(), 202)
+
+    rows = exports.stream_review_rows(date_after, date_before)
+    return exports.create_export_response(rows, exports.REVIEW_COLUMNS, export_format)
+
+
+@router.get('/export/complaints', dependencies=[Depends(user_required)])
+@transaction(1)
+async def export_complaints_file(
+        request: Request,
+        date_after: Optional[datetime] = None,
+        date_before: Optional[datetime] = None,
+        export_format: exports.ExportFormat = Query('xlsx', alias='format')
+) -> Response:
+    if await exports.requires_export_job(Complaint, export_format, date_after, date_before):
+        job = exports.submit_export(lambda: exports.stream_complaint_rows(date_after, date_before), exports.COMPLAINT_COLUMNS, export_format)
+        return JSONResponse(create_export_job_response(job, str(request.base_url).rstrip('/')).model_dump(), 202)
+
+    rows = exports.stream_complaint_rows(date_after, date_before)
+    return exports.create_export_response(rows, exports.COMPLAINT_COLUMNS, export_format)
+
+
+@router.post('/export/reviews/jobs', dependencies=[Depends(user_required)])
+async def create_reviews_export_job(
+        request: Request,
+        date_after: Optional[datetime] = None,
+        date_before: Optional[datetime] = None,
+        export_format: exports.ExportFormat = Query('xlsx', alias='format')
+) -> ExportJobResponse:
+    job = exports.submit_export(lambda: exports.stream_review_rows(date_after, date_before), exports.REVIEW_COLUMNS, export_format)
+
+    return create_export_job_response(job, str(request.base_url).rstrip('/'))
+
+
+@router.post('/export/complaints/jobs', dependencies=[Depends(user_required)])
+async def create_complaints_export_job(
+        request: Request,
+        date_after: Optional[datetime] = None,
+        date_before: Optional[datetime] = None,
+        export_format: exports.ExportFormat = Query('xlsx', alias='format')
+) -> ExportJobResponse:
+    job = exports.submit_export(lambda: exports.stream_complaint_rows(date_after, date_before), exports.COMPLAINT_COLUMNS, export_format)
+
+    return create_export_job_response(job, str(request.base_url).rstrip('/'))
+
 
-    extension = os.path.splitext(file.filename)[1]
-    filename = f'{uuid.uuid4().hex}{extension}'
+@router.get('/export/jobs/{job_id}', dependencies=[Depends(user_required)])
+async def get_export_job(request: Request, job_id: str, wait: float = Query(0, ge=0, le=30)) -> ExportJobResponse:
+    job = exports.get_export_job(job_id)
+    if wait:
+        await job.wait(wait)
 
-    file_path = os.path.join('images', filename)
-    async with aiofiles.open(file_path, 'wb') as output_file:
-        await output_file.write(await file.read())
+    return create_export_job_response(job, str(request.base_url).rstrip('/'))
+
+
+@router.get('/export/jobs/{job_id}/download', dependencies=[Depends(user_required)])
+async def download_export_file(job_id: str) -> FileResponse:
+    file_path = exports.get_export_file_path(job_id)
+    _, media_type = exports.EXPORT_FORMATS[os.path.splitext(file_path)[1][1:]]
+
+    return FileResponse(file_path, media_type=media_type, filename=os.path.basename(file_path))
+
+
+@router.post('/images/upload', dependencies=[Depends(user_required)])
+@transaction(1)
+async def upload_image_file(request: Request, file: UploadFile = File(...)) -> UploadImageResponse:
+    filename = await images.save_image_file(file)
 
     base_url = str(request.base_url).rstrip('/')
     return UploadImageResponse(
@@ -262,12 +338,8 @@ async def upload_image_file(request: Request, file: UploadFile = File(...)) -> U
 
 
 @router.get('/images/{image_path}')
-async def get_image_file(image_path: str) -> FileResponse:
-    full_path = os.path.join('images', image_path)
-    if not os.path.isfile(full_path):
-        raise HTTPException(status_code=404, detail='Image not found!')
-
-    return FileResponse(full_path)
+async def get_image_file(request: Request, image_path: str, w: Optional[int] = Query(None, ge=1)) -> Response:
+    return await images.create_image_response(request, image_path, w)
 
 
 @plugin.setup()
@@ -1,11 +1,13 @@
-from fastapi import APIRouter, BackgroundTasks, FastAPI, HTTPException
+from fastapi import APIRouter, FastAPI, HTTPException, Query
 from rewire import simple_plugin
 from rewire_sqlmodel import session_context, transaction
+from starlette.responses import StreamingResponse
 
-from src import chatgpt
-from src.models import Aspect, Complaint, Doctor, Platform, Prompt, Reason, Review, Reward, Service, Source
-from src.schemas import create_review_response, CreateComplaintRequest, CreateComplaintResponse, CreateReviewResponse, ReviewAspectsRequest, ReviewContactsRequest, ReviewDoctorsRequest, ReviewResponse, ReviewRewardRequest, ReviewServicesRequest, ReviewSourceRequest, ReviewTextRequest
-from src.utils import send_alert_message
+from src import generation, stats
+from src.models import Aspect, Complaint, Doctor, Platform, Reason, Review, Reward, Service, Source
+from src.schemas import create_generation_job_response, create_review_response, CreateComplaintRequest, CreateComplaintResponse, CreateReviewResponse, GenerationJobResponse, ReviewAspectsRequest, ReviewContactsRequest, ReviewDoctorsRequest, ReviewResponse, ReviewRewardRequest, ReviewServicesRequest, ReviewSourceRequest, ReviewTextRequest
+from src.outbox import add_alert_notifications
+from src.utils import create_complaint_alert_text
 
 plugin = simple_plugin()
 router = APIRouter(prefix='/api/reviews', tags=['Reviews'])
@@ -17,6 +19,7 @@ async def create_review() -> CreateReviewResponse:
     review = Review()
     review.add()
 
+    await stats.track_created('reviews', review)
     await session_context.get().commit()
     return CreateReviewResponse(**review.model_dump())
 
@@ -42,6 +45,13 @@ async def select_review_doctors(review_id: int, request: ReviewDoctorsRequest) -
     if not doctors:
         raise HTTPException(400, 'Doctors not found!')
 
+    await stats.track_selection(
+        'doctors',
+        review,
+        [item.id for item in review.selected_doctors],
+        [item.id for item in doctors]
+    )
+
     review.selected_doctors = doctors
     review.add()
 
@@ -59,6 +69,13 @@ async def select_review_services(review_id: int, request: ReviewServicesRequest)
     if not services:
         raise HTTPException(400, 'Services not found!')
 
+    await stats.track_selection(
+        'services',
+        review,
+        [item.id for item in review.selected_services],
+        [item.id for item in services]
+    )
+
     review.selected_services = services
     review.add()
 
@@ -76,6 +93,13 @@ async def select_review_aspects(review_id: int, request: ReviewAspectsRequest) -
     if not aspects:
         raise HTTPException(400, 'Aspects not found!')
 
+    await stats.track_selection(
+        'aspects',
+        review,
+        [item.id for item in review.selected_aspects],
+        [item.id for item in aspects]
+    )
+
     review.selected_aspects = aspects
     review.add()
 
@@ -93,6 +117,13 @@ async def select_review_source(review_id: int, request: ReviewSourceRequest) ->
     if not source:
         raise HTTPException(400, 'Source not found!')
 
+    await stats.track_selection(
+        'sources',
+        review,
+        [review.selected_source.id] if review.selected_source else [],
+        [source.id]
+    )
+
     review.selected_source = source
     review.add()
 
@@ -127,57 +158,39 @@ async def update_review_text(review_id: int, request: ReviewTextRequest) -> Revi
 
 
 @router.post('/{review_id}/generate')
-@transaction(1)
-async def generate_review_text(review_id: int, background_tasks: BackgroundTasks) -> ReviewResponse:
-    review = await Review.get_by_id(review_id)
-    if not review:
-        raise HTTPException(404, 'Review not found!')
+async def generate_review_text(review_id: int) -> ReviewResponse:
+    job = generation.submit_review_generation(review_id)
+    await job.wait()
 
-    reviews_prompt = await Prompt.get_by_id('reviews')
-    if not reviews_prompt:
-        raise HTTPException(404, 'Reviews prompt not found!')
-
-    review_text = await chatgpt.generate_review_text(
-        prompt_text=reviews_prompt.prompt_text,
-        temperature=reviews_prompt.temperature,
-        frequency_penalty=reviews_prompt.frequency_penalty,
-        doctors=review.selected_doctors,
-        services=review.selected_services,
-        aspects=review.selected_aspects,
-        source=review.selected_source
-    )
+    if job.status == 'failed':
+        raise HTTPException(job.error_code, job.error)
 
-    review.review_text = review_text
-    review.add()
+    return job.result
 
-    session = session_context.get()
-    await session.commit()
-
-    doctors_text = ', '.join(doctor.name for doctor in review.selected_doctors) or '—'
-    services_text = ', '.join(service.name for service in review.selected_services) or '—'
-    aspects_text = ', '.join(aspect.name for aspect in review.selected_aspects) or '—'
-    source_text = review.selected_source.name if review.selected_source else '—'
-
-    message_text = (
-        f'🆕 <b>Сгенерирован новый отзыв</b>\n\n'
-        f'🆔 ID: <b>{review.id}</b>\n'
-        f'📅 Дата: {review.created_at.strftime('%d/%m/%Y %H:%M')}\n\n'
-        f'👤 Имя: {review.contact_name or '—'}\n'
-        f'📞 Телефон: {review.contact_phone or '—'}\n\n'
-        f'👨‍⚕️ Врачи: {doctors_text}\n'
-        f'🛎 Услуги: {services_text}\n'
-        f'⭐ Аспекты: {aspects_text}\n'
-        f'🌐 Источник: {source_text}\n\n'
-        f'📝 <b>Текст отзыва:</b>\n'
-        f'{review.review_text or '—'}'
-    )
 
-    background_tasks.add_task(
-        send_alert_message,
-        message_text
+@router.get('/{review_id}/generate/stream')
+async def stream_review_text(review_id: int) -> StreamingResponse:
+    review, reviews_prompt = await generation.load_review_prompt(review_id)
+    return StreamingResponse(
+        generation.stream_review(review, reviews_prompt),
+        media_type='text/event-stream',
+        headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'}
     )
 
-    return create_review_response(review)
+
+@router.post('/{review_id}/generate/jobs')
+async def create_generation_job(review_id: int) -> GenerationJobResponse:
+    job = generation.submit_review_generation(review_id)
+    return create_generation_job_response(job)
+
+
+@router.get('/jobs/{job_id}')
+async def get_generation_job(job_id: str, wait: float = Query(0, ge=0, le=30)) -> GenerationJobResponse:
+    job = generation.get_generation_job(job_id)
+    if wait:
+        await job.wait(wait)
+
+    return create_generation_job_response(job)
 
 
 @router.post('/{review_id}/reward')
@@ -191,6 +204,13 @@ async def select_review_reward(review_id: int, request: ReviewRewardRequest) ->
     if not reward:
         raise HTTPException(400, 'Reward not found!')
 
+    await stats.track_selection(
+        'rewards',
+        review,
+        [review.selected_reward.id] if review.selected_reward else [],
+        [reward.id]
+    )
+
     review.selected_reward = reward
     review.add()
 
@@ -212,12 +232,14 @@ async def add_review_platform(review_id: int, platform_id: int) -> ReviewRespons
         review.published_platforms.append(platform)
         review.add()
 
+        await stats.track_selection('platforms', review, [], [platform.id])
+
     return create_review_response(review)
 
 
 @router.post('/complaint')
 @transaction(1)
-async def create_complaint(request: CreateComplaintRequest, background_tasks: BackgroundTasks) -> CreateComplaintResponse:
+async def create_complaint(request: CreateComplaintRequest) -> CreateComplaintResponse:
     reasons = await Reason.get_by_ids(request.reason_ids)
     if not reasons:
         raise HTTPException(400, 'Reasons not found!')
@@ -225,25 +247,11 @@ async def create_complaint(request: CreateComplaintRequest, background_tasks: Ba
     complaint = Complaint(**request.model_dump(), selected_reasons=reasons)
     complaint.add()
 
-    session = session_context.get()
-    await session.commit()
-
-    reasons_text = ', '.join(reason.name for reason in complaint.selected_reasons) or '—'
-    message_text = (
-        f'🚨 <b>Новая жалоба</b>\n\n'
-        f'🆔 ID: <b>{complaint.id}</b>\n'
-        f'📅 Дата: {complaint.created_at.strftime('%d/%m/%Y %H:%M')}\n\n'
-        f'👤 Имя: {complaint.contact_name or 'анонимно'}\n'
-        f'📞 Телефон: {complaint.contact_phone or 'анонимно'}\n'
-        f'⚠ Причины: {reasons_text}\n\n'
-        f'📝 <b>Текст жалобы:</b>\n'
-        f'{complaint.complaint_text or 'отсутствует'}'
-    )
+    await stats.track_created('complaints', complaint)
+    await stats.track_selection('reasons', complaint, [], [reason.id for reason in reasons])
 
-    background_tasks.add_task(
-        send_alert_message,
-        message_text
-    )
+    await session_context.get().flush()
+    await add_alert_notifications(create_complaint_alert_text(complaint))
 
     return CreateComplaintResponse(**complaint.model_dump())
 
@@ -1,7 +1,9 @@
-from typing import List, Optional
+from datetime import date
+from typing import List, Literal, Optional
 
 from pydantic import BaseModel
 
+from src.jobs import Job
 from src.models import Complaint, Doctor, Review
 
 
@@ -34,6 +36,16 @@ class LoginRequest(BaseModel):
 class LoginResponse(BaseModel):
     user: UserResponse
     access_token: str
+    refresh_token: str
+
+
+class RefreshTokenRequest(BaseModel):
+    refresh_token: str
+
+
+class TokenResponse(BaseModel):
+    access_token: str
+    refresh_token: str
 
 
 class ResetPasswordRequest(BaseModel):
@@ -50,6 +62,10 @@ class UploadImageResponse(BaseModel):
     image_url: str
 
 
+class SweepImagesResponse(BaseModel):
+    removed_filenames: List[str]
+
+
 class DoctorRequest(BaseModel):
     name: str
     role: str
@@ -216,6 +232,20 @@ class ReviewResponse(BaseModel):
     published_platforms: List[PlatformResponse]
 
 
+class GenerationJobResponse(BaseModel):
+    id: str
+    status: Literal['pending', 'running', 'completed', 'failed']
+    review: Optional[ReviewResponse]
+    error: Optional[str]
+
+
+class ExportJobResponse(BaseModel):
+    id: str
+    status: Literal['pending', 'running', 'completed', 'failed']
+    download_url: Optional[str]
+    error: Optional[str]
+
+
 class CreateComplaintRequest(BaseModel):
     contact_name: str
     contact_phone: str
@@ -240,6 +270,52 @@ class ReviewsDashboardResponse(BaseModel):
     complaints: List['ComplaintResponse']
 
 
+class ReviewsPageResponse(BaseModel):
+    reviews: List[ReviewResponse]
+    next_cursor: Optional[str]
+
+
+class ComplaintsPageResponse(BaseModel):
+    complaints: List[ComplaintResponse]
+    next_cursor: Optional[str]
+
+
+class StatsItemResponse(BaseModel):
+    id: int
+    name: str
+    count: int
+
+
+class StatsDayResponse(BaseModel):
+    day: date
+    reviews: int
+    complaints: int
+
+
+class DashboardStatsResponse(BaseModel):
+    reviews: int
+    complaints: int
+    doctors: List[StatsItemResponse]
+    services: List[StatsItemResponse]
+    aspects: List[StatsItemResponse]
+    sources: List[StatsItemResponse]
+    rewards: List[StatsItemResponse]
+    platforms: List[StatsItemResponse]
+    reasons: List[StatsItemResponse]
+    days: List[StatsDayResponse]
+
+
+class CatalogResponse(BaseModel):
+    doctors: List[DoctorResponse]
+    services: List[ServiceResponse]
+    aspects: List[AspectResponse]
+    sources: List[SourceResponse]
+    rewards: List[RewardResponse]
+    platforms: List[PlatformResponse]
+    reasons: List[ReasonResponse]
+    news: List[NewsResponse]
+
+
 class StartLinkResponse(BaseModel):
     start_link: str
 
@@ -287,6 +363,24 @@ def create_review_response(review: Review) -> ReviewResponse:
     )
 
 
+def create_generation_job_response(job: Job) -> GenerationJobResponse:
+    return GenerationJobResponse(
+        id=job.id,
+        status=job.status,
+        review=job.result,
+        error=job.error
+    )
+
+
+def create_export_job_response(job: Job, base_url: str) -> ExportJobResponse:
+    return ExportJobResponse(
+        id=job.id,
+        status=job.status,
+        download_url=f'{base_url}/api/export/jobs/{job.id}/download' if job.status == 'completed' else None,
+        error=job.error
+    )
+
+
 def create_complaint_response(complaint: Complaint) -> ComplaintResponse:
     return ComplaintResponse(
         id=complaint.id,
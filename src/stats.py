@@ -0,0 +1,91 @@
+from collections import defaultdict
+from datetime import date, datetime
+from typing import Dict, Iterable, Optional
+
+from rewire_sqlmodel import session_context
+from sqlalchemy import insert, literal
+from sqlmodel import delete, func, select
+
+from src.models import Aspect, Complaint, ComplaintReasonLink, DailyStat, DateModel, Doctor, Platform, Reason, Review, ReviewAspectLink, ReviewDoctorLink, ReviewPlatformLink, ReviewRewardLink, ReviewServiceLink, ReviewSourceLink, Reward, Service, Source
+from src.schemas import DashboardStatsResponse, StatsDayResponse, StatsItemResponse
+
+STATS_TOTALS = {
+    'reviews': Review,
+    'complaints': Complaint,
+}
+
+STATS_LINKS = {
+    'doctors': (Review, Doctor, ReviewDoctorLink, ReviewDoctorLink.review_id, ReviewDoctorLink.doctor_id),
+    'services': (Review, Service, ReviewServiceLink, ReviewServiceLink.review_id, ReviewServiceLink.service_id),
+    'aspects': (Review, Aspect, ReviewAspectLink, ReviewAspectLink.review_id, ReviewAspectLink.aspect_id),
+    'sources': (Review, Source, ReviewSourceLink, ReviewSourceLink.review_id, ReviewSourceLink.source_id),
+    'rewards': (Review, Reward, ReviewRewardLink, ReviewRewardLink.review_id, ReviewRewardLink.reward_id),
+    'platforms': (Review, Platform, ReviewPlatformLink, ReviewPlatformLink.review_id, ReviewPlatformLink.platform_id),
+    'reasons': (Complaint, Reason, ComplaintReasonLink, ComplaintReasonLink.complaint_id, ComplaintReasonLink.reason_id),
+}
+
+
+async def track_created(kind: str, item: DateModel):
+    await DailyStat.increment(item.created_at.date(), kind, [0])
+
+
+async def track_selection(kind: str, item: DateModel, old_ids: Iterable[int], new_ids: Iterable[int]):
+    old_ids, new_ids = set(old_ids), set(new_ids)
+
+    await DailyStat.increment(item.created_at.date(), kind, new_ids - old_ids, 1)
+    await DailyStat.increment(item.created_at.date(), kind, old_ids - new_ids, -1)
+
+
+async def rebuild_daily_stats():
+    session = session_context.get()
+    await session.exec(delete(DailyStat))
+
+    columns = [DailyStat.day, DailyStat.kind, DailyStat.item_id, DailyStat.total]
+    for kind, model in STATS_TOTALS.items():
+        day_column = func.date(model.created_at)
+        query = (
+            select(day_column, literal(kind), literal(0), func.count())
+            .group_by(day_column)
+        )
+
+        await session.exec(insert(DailyStat).from_select(columns, query))
+
+    for kind, (model, item_model, link_model, owner_column, item_column) in STATS_LINKS.items():
+        day_column = func.date(model.created_at)
+        query = (
+            select(day_column, literal(kind), item_column, func.count())
+            .select_from(link_model)
+            .join(model, model.id == owner_column)
+            .group_by(day_column, item_column)
+        )
+
+        await session.exec(insert(DailyStat).from_select(columns, query))
+
+
+async def get_dashboard_stats(date_after: Optional[datetime] = None, date_before: Optional[datetime] = None) -> DashboardStatsResponse:
+    days: Dict[date, Dict[str, int]] = defaultdict(lambda: defaultdict(int))
+    totals: Dict[str, Dict[int, int]] = defaultdict(lambda: defaultdict(int))
+
+    for daily_stat in await DailyStat.get_between(date_after, date_before):
+        if daily_stat.kind in STATS_TOTALS:
+            days[daily_stat.day][daily_stat.kind] += daily_stat.total
+
+        totals[daily_stat.kind][daily_stat.item_id] += daily_stat.total
+
+    items = {}
+    for kind, (_, item_model, *_) in STATS_LINKS.items():
+        items[kind] = [
+            StatsItemResponse(id=item.id, name=item.name, count=totals[kind][item.id])
+            for item in await item_model.get_all()
+            if totals[kind][item.id]
+        ]
+
+    return DashboardStatsResponse(
+        reviews=totals['reviews'][0],
+        complaints=totals['complaints'][0],
+        days=[
+            StatsDayResponse(day=day, reviews=days[day]['reviews'], complaints=days[day]['complaints'])
+            for day in sorted(days.keys())
+        ],
+        **items
+    )
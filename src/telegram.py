@@ -1,7 +1,9 @@
+import asyncio
+
 from aiogram import Bot, Dispatcher, Router
 from aiogram.client.default import DefaultBotProperties
 from aiogram.enums import ParseMode
-from aiogram.exceptions import TelegramAPIError
+from aiogram.exceptions import TelegramAPIError, TelegramRetryAfter
 from aiogram.filters import CommandObject, CommandStart
 from aiogram.filters.callback_data import CallbackData
 from aiogram.fsm.storage.memory import MemoryStorage
@@ -10,20 +12,28 @@ from aiogram.utils.callback_answer import CallbackAnswerMiddleware
 from aiogram.utils.keyboard import InlineKeyboardBuilder
 from pydantic import BaseModel
 from rewire import config, DependenciesModule, logger, simple_plugin
-from rewire_sqlmodel import transaction
+from rewire_sqlmodel import session_context, transaction
 
 from src import auth
 from src.models import User
+from src.ratelimit import KeyedTokenBucket, TokenBucket
+from src.recipients import update_recipient
 
 
 @config
 class Config(BaseModel):
     token: str
+    rate_limit: float = 30
+    chat_rate_limit: float = 1
+    max_retries: int = 3
 
 
 plugin = simple_plugin()
 router = Router()
 
+BOT_RATE_LIMITER = TokenBucket(Config.rate_limit)
+CHAT_RATE_LIMITER = KeyedTokenBucket(Config.chat_rate_limit)
+
 
 class UnlinkUserCallback(CallbackData, prefix='unlink_user'):
     user_id: int
@@ -68,6 +78,10 @@ async def start_command_handler(message: Message, command: CommandObject):
     user.telegram_name = message.from_user.full_name
     user.add()
 
+    await session_context.get().commit()
+    update_recipient(user)
+    auth.invalidate_user(user.id)
+
     await message.answer(
         f'✨ Telegram успешно привязан к аккаунту <b>«{user.name}»</b>!\n'
         'Теперь все уведомления о новых отзывах и жалобах будут направляться сюда.',
@@ -85,17 +99,35 @@ async def unlink_user_callback(callback: CallbackQuery, callback_data: UnlinkUse
     user.telegram_name = None
     user.add()
 
+    await session_context.get().commit()
+    update_recipient(user)
+    auth.invalidate_user(user.id)
+
     await callback.message.edit_text(
         f'🛑 Telegram успешно отвязан от аккаунта <b>«{user.name}»</b>.\n'
         'Вы больше не будете получать уведомления о новых отзывах и жалобах.'
     )
 
 
-async def send_telegram_message(user_id: int, message_text: str):
-    try:
-        await get_telegram_bot().send_message(chat_id=user_id, text=message_text)
-    except TelegramAPIError as e:
-        logger.error(f'Failed to send message to {user_id}: {e}')
+async def send_telegram_message(user_id: int, message_text: str) -> bool:
+    for attempt in range(Config.max_retries + 1):
+        await CHAT_RATE_LIMITER.acquire(user_id)
+        await BOT_RATE_LIMITER.acquire()
+
+        try:
+            await get_telegram_bot().send_message(chat_id=user_id, text=message_text)
+            return True
+        except TelegramRetryAfter as e:
+            if attempt == Config.max_retries:
+                logger.error(f'Failed to send message to {user_id}: still rate limited after {attempt} retries')
+                return False
+
+            await asyncio.sleep(e.retry_after)
+        except TelegramAPIError as e:
+            logger.error(f'Failed to send message to {user_id}: {e}')
+            return False
+
+    return False
 
 
 def get_telegram_bot() -> Bot:
@@ -1,63 +1,214 @@
 import asyncio
-from io import BytesIO
-from typing import Dict, List
+import base64
+import csv
+import json
+import threading
+from datetime import datetime
+from io import RawIOBase, StringIO
+from itertools import chain, islice
+from typing import AsyncIterator, BinaryIO, Dict, Iterable, Iterator, List, Tuple
 
+from fastapi import HTTPException
 from openpyxl import Workbook
+from openpyxl.cell import WriteOnlyCell
 from openpyxl.styles import Font
 from openpyxl.utils import get_column_letter
-from rewire_sqlmodel import transaction
+from starlette.requests import Request
 
-from src.max import send_max_message
-from src.models import User
-from src.telegram import send_telegram_message
+from src.models import Complaint, DateModel, Review
 
 
-def export_rows_to_excel(
-        rows_data: List[Dict],
+class ChunkWriter(RawIOBase):
+    def __init__(self, loop: asyncio.AbstractEventLoop, chunks: asyncio.Queue, cancelled: threading.Event):
+        super().__init__()
+        self.loop = loop
+        self.chunks = chunks
+        self.cancelled = cancelled
+
+    def writable(self) -> bool:
+        return True
+
+    def write(self, data) -> int:
+        if self.cancelled.is_set():
+            raise OSError('Export cancelled!')
+
+        asyncio.run_coroutine_threadsafe(self.chunks.put(bytes(data)), self.loop).result()
+        return len(data)
+
+
+def iterate_in_thread(rows: AsyncIterator[Dict], loop: asyncio.AbstractEventLoop) -> Iterator[Dict]:
+    while True:
+        try:
+            yield asyncio.run_coroutine_threadsafe(anext(rows), loop).result()
+        except StopAsyncIteration:
+            return
+
+
+def write_rows_to_excel(
+        rows: Iterable[Dict],
+        column_names: List[str],
+        output_file: BinaryIO,
+        sample_size: int = 200,
         max_column_width: int = 40,
         width_padding_ratio: float = 0.15
-) -> bytes:
-    workbook = Workbook()
-    worksheet = workbook.active
-
-    column_names = list(rows_data[0].keys())
-    header_style = Font(bold=True)
+):
+    rows = iter(rows)
+    sample_rows = list(islice(rows, sample_size))
 
-    for column_index, column_name in enumerate(column_names, start=1):
-        cell = worksheet.cell(row=1, column=column_index, value=column_name)
-        cell.font = header_style
+    workbook = Workbook(write_only=True)
+    worksheet = workbook.create_sheet()
 
-    for row_index, row in enumerate(rows_data, start=2):
-        for column_index, column_name in enumerate(column_names, start=1):
-            worksheet.cell(row=row_index, column=column_index, value=row.get(column_name))
+    header_style = Font(bold=True)
 
     for column_index, column_name in enumerate(column_names, start=1):
-        column_letter = get_column_letter(column_index)
-        max_text_length = len(str(column_name))
-
-        for cell in worksheet[column_letter]:
-            if cell.value is not None:
-                max_text_length = max(max_text_length, len(str(cell.value)))
+        max_text_length = max(
+            [len(str(column_name))] + [
+                len(str(row.get(column_name)))
+                for row in sample_rows
+                if row.get(column_name) is not None
+            ]
+        )
 
         padded_width = max_text_length * (1 + width_padding_ratio)
-        worksheet.column_dimensions[column_letter].width = min(
+        worksheet.column_dimensions[get_column_letter(column_index)].width = min(
             padded_width,
             max_column_width
         )
 
-    excel_buffer = BytesIO()
-    workbook.save(excel_buffer)
-    excel_buffer.seek(0)
-    return excel_buffer.getvalue()
+    header_cells = []
+    for column_name in column_names:
+        cell = WriteOnlyCell(worksheet, value=column_name)
+        cell.font = header_style
+        header_cells.append(cell)
+
+    worksheet.append(header_cells)
+
+    for row in chain(sample_rows, rows):
+        worksheet.append([row.get(column_name) for column_name in column_names])
+
+    workbook.save(output_file)
+
+
+async def stream_rows_to_excel(rows: AsyncIterator[Dict], column_names: List[str], buffer_size: int = 16) -> AsyncIterator[bytes]:
+    # A write-only workbook buffers rows in a temp file and emits the zip only on save(), so nothing
+    # reaches the client until every row has been written. Large exports should go through a job instead.
+    loop = asyncio.get_running_loop()
+    chunks = asyncio.Queue(buffer_size)
+    cancelled = threading.Event()
+
+    def write_workbook():
+        try:
+            write_rows_to_excel(iterate_in_thread(rows, loop), column_names, ChunkWriter(loop, chunks, cancelled))
+        except OSError:
+            if not cancelled.is_set():
+                raise
+        finally:
+            asyncio.run_coroutine_threadsafe(chunks.put(None), loop).result()
+
+    writer_task = asyncio.create_task(asyncio.to_thread(write_workbook))
+    try:
+        while (chunk := await chunks.get()) is not None:
+            yield chunk
+    finally:
+        cancelled.set()
+        while not writer_task.done():
+            while not chunks.empty():
+                chunks.get_nowait()
+
+            await asyncio.wait([writer_task], timeout=0.1)
+
+        await writer_task
+
+
+async def stream_rows_to_csv(rows: AsyncIterator[Dict], column_names: List[str], chunk_size: int = 65536) -> AsyncIterator[bytes]:
+    buffer = StringIO()
+    writer = csv.DictWriter(buffer, fieldnames=column_names)
+    writer.writeheader()
+
+    async for row in rows:
+        writer.writerow(row)
+        if buffer.tell() >= chunk_size:
+            yield buffer.getvalue().encode()
+            buffer.seek(0)
+            buffer.truncate()
+
+    if buffer.tell():
+        yield buffer.getvalue().encode()
+
+
+async def stream_rows_to_ndjson(rows: AsyncIterator[Dict], column_names: List[str], chunk_size: int = 65536) -> AsyncIterator[bytes]:
+    buffer = StringIO()
+
+    async for row in rows:
+        buffer.write(json.dumps({column_name: row.get(column_name) for column_name in column_names}, ensure_ascii=False, default=str))
+        buffer.write('\n')
+
+        if buffer.tell() >= chunk_size:
+            yield buffer.getvalue().encode()
+            buffer.seek(0)
+            buffer.truncate()
+
+    if buffer.tell():
+        yield buffer.getvalue().encode()
+
+
+def encode_cursor(item: DateModel) -> str:
+    return base64.urlsafe_b64encode(f'{item.created_at.isoformat()}|{item.id}'.encode()).decode()
+
+
+def decode_cursor(cursor: str) -> Tuple[datetime, int]:
+    try:
+        created_at, item_id = base64.urlsafe_b64decode(cursor.encode()).decode().split('|')
+        return datetime.fromisoformat(created_at), int(item_id)
+    except ValueError:
+        raise HTTPException(400, 'Invalid cursor!')
+
+
+def is_not_modified(request: Request, etag: str) -> bool:
+    if_none_match = request.headers.get('if-none-match')
+    if not if_none_match:
+        return False
+
+    request_etags = {
+        request_etag.strip().removeprefix('W/')
+        for request_etag in if_none_match.split(',')
+    }
+
+    return '*' in request_etags or etag in request_etags
+
+
+def create_review_alert_text(review: Review) -> str:
+    doctors_text = ', '.join(doctor.name for doctor in review.selected_doctors) or '—'
+    services_text = ', '.join(service.name for service in review.selected_services) or '—'
+    aspects_text = ', '.join(aspect.name for aspect in review.selected_aspects) or '—'
+    source_text = review.selected_source.name if review.selected_source else '—'
+
+    return (
+        f'🆕 <b>Сгенерирован новый отзыв</b>\n\n'
+        f'🆔 ID: <b>{review.id}</b>\n'
+        f'📅 Дата: {review.created_at.strftime('%d/%m/%Y %H:%M')}\n\n'
+        f'👤 Имя: {review.contact_name or '—'}\n'
+        f'📞 Телефон: {review.contact_phone or '—'}\n\n'
+        f'👨‍⚕️ Врачи: {doctors_text}\n'
+        f'🛎 Услуги: {services_text}\n'
+        f'⭐ Аспекты: {aspects_text}\n'
+        f'🌐 Источник: {source_text}\n\n'
+        f'📝 <b>Текст отзыва:</b>\n'
+        f'{review.review_text or '—'}'
+    )
+
 
+def create_complaint_alert_text(complaint: Complaint) -> str:
+    reasons_text = ', '.join(reason.name for reason in complaint.selected_reasons) or '—'
 
-@transaction(1)
-async def send_alert_message(message_text: str):
-    for user in await User.get_all():
-        if user.max_id:
-            await send_max_message(user.max_id, message_text)
-            await asyncio.sleep(0.1)
+    return (
+        f'🚨 <b>Новая жалоба</b>\n\n'
+        f'🆔 ID: <b>{complaint.id}</b>\n'
+        f'📅 Дата: {complaint.created_at.strftime('%d/%m/%Y %H:%M')}\n\n'
+        f'👤 Имя: {complaint.contact_name or 'анонимно'}\n'
+        f'📞 Телефон: {complaint.contact_phone or 'анонимно'}\n'
+        f'⚠ Причины: {reasons_text}\n\n'
+        f'📝 <b>Текст жалобы:</b>\n'
+        f'{complaint.complaint_text or 'отсутствует'}'
+    )
 
-        if user.telegram_id:
-            await send_telegram_message(user.telegram_id, message_text)
-            await asyncio.sleep(0.1)
@@ -0,0 +1,80 @@
+import os
+from typing import List, Optional
+
+from PIL import ExifTags, features, Image, ImageOps
+
+VARIANT_MODES = ('RGB', 'RGBA')
+
+
+def get_variant_filename(stem: str, width: Optional[int], extension: str) -> str:
+    if width:
+        return f'{stem}-{width}{extension}'
+
+    return f'{stem}{extension}'
+
+
+def get_variant_filenames(stem: str, extension: str, image_width: int, widths: List[int], formats: List[str]) -> List[str]:
+    filenames = []
+    for width in [None] + [width for width in widths if width < image_width]:
+        if width:
+            filenames.append(get_variant_filename(stem, width, extension))
+
+        filenames += [get_variant_filename(stem, width, f'.{image_format}') for image_format in formats]
+
+    return filenames
+
+
+def get_oriented_width(image: Image.Image) -> int:
+    # EXIF orientations 5-8 are rotated by 90 degrees, exif_transpose swaps their sides
+    if image.getexif().get(ExifTags.Base.Orientation) in (5, 6, 7, 8):
+        return image.height
+
+    return image.width
+
+
+def save_variant(image: Image.Image, file_path: str, image_format: str, quality: int):
+    temp_path = f'{file_path}.tmp'
+    try:
+        image.save(temp_path, format=image_format, quality=quality)
+        os.replace(temp_path, file_path)
+    finally:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+
+
+def create_image_variants(file_path: str, variants_directory: str, widths: List[int], formats: List[str], quality: int) -> List[str]:
+    stem, extension = os.path.splitext(os.path.basename(file_path))
+    formats = [image_format for image_format in formats if features.check(image_format)]
+    filenames = []
+
+    with Image.open(file_path) as original_image:
+        if getattr(original_image, 'is_animated', False):
+            return filenames
+
+        variant_filenames = get_variant_filenames(stem, extension, get_oriented_width(original_image), widths, formats)
+        if all(os.path.isfile(os.path.join(variants_directory, filename)) for filename in variant_filenames):
+            return variant_filenames
+
+        original_format = original_image.format
+        image = ImageOps.exif_transpose(original_image)
+
+        for width in [None] + [width for width in widths if width < image.width]:
+            if width:
+                height = max(1, round(image.height * width / image.width))
+                variant_image = image.resize((width, height), Image.Resampling.LANCZOS)
+
+                filename = get_variant_filename(stem, width, extension)
+                save_variant(variant_image, os.path.join(variants_directory, filename), original_format, quality)
+                filenames.append(filename)
+            else:
+                variant_image = image
+
+            if variant_image.mode not in VARIANT_MODES:
+                variant_image = variant_image.convert('RGBA')
+
+            for image_format in formats:
+                filename = get_variant_filename(stem, width, f'.{image_format}')
+                save_variant(variant_image, os.path.join(variants_directory, filename), image_format.upper(), quality)
+                filenames.append(filename)
+
+    return filenames
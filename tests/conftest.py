@@ -0,0 +1,25 @@
+import asyncio
+import os
+
+from rewire import Space
+from rewire.config import ConfigModule
+
+os.environ.setdefault('DATABASE_URL', 'sqlite://')
+os.environ.setdefault('JWT_SECRET', 'test-secret')
+os.environ.setdefault('JWT_ALGORITHM', 'HS256')
+os.environ.setdefault('TELEGRAM_TOKEN', '123456:test')
+os.environ.setdefault('MAX_TOKEN', 'test')
+os.environ.setdefault('LOG_LEVEL', 'WARNING')
+
+
+async def load_modules():
+    # Configs are read on import, and models must be registered before prefill_db generates migrations
+    async with Space(only=[ConfigModule]).init().use():
+        import src.catalog  # noqa: F401
+        import src.exports  # noqa: F401
+        import src.images  # noqa: F401
+        import src.outbox  # noqa: F401
+        import src.models  # noqa: F401
+
+
+asyncio.run(load_modules())
@@ -0,0 +1,30 @@
+from src.catalog import get_enabled_items
+from src.schemas import DoctorResponse, ServiceResponse
+
+ENABLED_SERVICE = ServiceResponse(id=1, name='Чистка', category='', is_enabled=True)
+DISABLED_SERVICE = ServiceResponse(id=2, name='Отбеливание', category='', is_enabled=False)
+
+
+def create_doctor(doctor_id: int, is_enabled: bool) -> DoctorResponse:
+    return DoctorResponse(
+        id=doctor_id,
+        name=f'Doctor {doctor_id}',
+        role='',
+        avatar_url=None,
+        is_enabled=is_enabled,
+        services=[ENABLED_SERVICE, DISABLED_SERVICE]
+    )
+
+
+def test_catalog_hides_disabled_doctors_and_their_disabled_services():
+    doctors = [create_doctor(1, True), create_doctor(2, False)]
+
+    enabled_doctors = get_enabled_items(doctors)
+
+    assert [doctor.id for doctor in enabled_doctors] == [1]
+    assert enabled_doctors[0].services == [ENABLED_SERVICE]
+    assert doctors[0].services == [ENABLED_SERVICE, DISABLED_SERVICE]
+
+
+def test_catalog_keeps_enabled_services():
+    assert get_enabled_items([ENABLED_SERVICE, DISABLED_SERVICE]) == [ENABLED_SERVICE]
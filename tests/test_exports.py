@@ -0,0 +1,66 @@
+from datetime import datetime
+
+import pytest
+from rewire_sqlmodel import session_context, transaction
+from rewire_sqlmodel.tests import prefill_db
+
+from src import exports
+from src.models import Complaint, ComplaintReasonLink, Doctor, Reason, Review, ReviewDoctorLink
+from src.utils import stream_rows_to_csv
+
+
+async def collect_bytes(chunks) -> bytes:
+    return b''.join([chunk async for chunk in chunks])
+
+
+async def empty_rows():
+    return
+    yield
+
+
+@pytest.mark.asyncio
+@prefill_db(
+    Doctor(id=1, position=2, name='Борисов', role=''),
+    Doctor(id=2, position=1, name='Яковлев', role=''),
+    Doctor(id=3, position=3, name='Андреев', role=''),
+    Review(id=1, created_at=datetime(2025, 1, 1)),
+    Review(id=2, created_at=datetime(2025, 1, 2)),
+    Review(id=3, created_at=datetime(2025, 1, 3)),
+    ReviewDoctorLink(review_id=1, doctor_id=1),
+    ReviewDoctorLink(review_id=1, doctor_id=2),
+    ReviewDoctorLink(review_id=1, doctor_id=3),
+    ReviewDoctorLink(review_id=2, doctor_id=3),
+)
+@transaction(1)
+async def test_review_rows_aggregate_only_their_own_names_in_catalog_order():
+    rows = [row async for row in exports.stream_review_rows()]
+
+    assert [row['Врач'] for row in rows] == ['Яковлев, Борисов, Андреев', 'Андреев', None]
+
+
+@pytest.mark.asyncio
+@prefill_db(
+    Reason(id=1, position=2, name='Долго ждал'),
+    Reason(id=2, position=1, name='Грубость'),
+    Complaint(id=1, created_at=datetime(2025, 1, 1)),
+    Complaint(id=2, created_at=datetime(2025, 1, 2)),
+    Complaint(id=3, created_at=datetime(2025, 1, 3)),
+    ComplaintReasonLink(complaint_id=1, reason_id=1),
+    ComplaintReasonLink(complaint_id=2, reason_id=1),
+    ComplaintReasonLink(complaint_id=2, reason_id=2),
+)
+@transaction(1)
+async def test_complaint_rows_aggregate_only_their_own_names_in_catalog_order():
+    rows = [row async for row in exports.stream_complaint_rows()]
+
+    assert [row['Причины'] for row in rows] == ['Долго ждал', 'Грубость, Долго ждал', None]
+
+
+@pytest.mark.asyncio
+@prefill_db()
+@transaction(1)
+async def test_empty_csv_export_has_header():
+    content = await collect_bytes(stream_rows_to_csv(empty_rows(), exports.COMPLAINT_COLUMNS))
+
+    assert content.decode().strip() == ','.join(exports.COMPLAINT_COLUMNS)
+    assert await Complaint.count_between() == 0
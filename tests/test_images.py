@@ -0,0 +1,48 @@
+import os
+from tempfile import TemporaryDirectory
+
+import pytest
+from PIL import Image
+from rewire_sqlmodel import transaction
+from rewire_sqlmodel.tests import prefill_db
+
+from src import images
+from src.images import CachedImage, get_accepted_extensions, IMAGE_CACHE, sweep_images
+from src.variants import create_image_variants
+
+
+def test_accept_header_respects_quality_values():
+    assert get_accepted_extensions('image/avif,image/webp,*/*;q=0.8') == ['.avif', '.webp']
+    assert get_accepted_extensions('image/avif;q=0, image/webp;q=0.5') == ['.webp']
+    assert get_accepted_extensions('image/avif;q=0.0,image/webp;q=abc') == []
+    assert get_accepted_extensions('image/*') == []
+
+
+def test_missing_variants_are_recreated():
+    with TemporaryDirectory() as directory:
+        file_path = os.path.join(directory, 'image.png')
+        Image.new('RGB', (400, 300)).save(file_path)
+
+        filenames = create_image_variants(file_path, directory, [160, 640], ['webp'], 80)
+        assert filenames == ['image.webp', 'image-160.png', 'image-160.webp']
+
+        os.remove(os.path.join(directory, 'image-160.webp'))
+        assert create_image_variants(file_path, directory, [160, 640], ['webp'], 80) == filenames
+        assert os.path.isfile(os.path.join(directory, 'image-160.webp'))
+
+
+@pytest.mark.asyncio
+@prefill_db()
+@transaction(1)
+async def test_sweep_purges_removed_images_from_memory_cache(monkeypatch, tmp_path):
+    monkeypatch.setattr(images.Config, 'directory', str(tmp_path))
+    monkeypatch.setattr(images.Config, 'sweep_grace_period', 0)
+    os.makedirs(tmp_path / 'variants')
+
+    filename = f'{"0" * 64}.png'
+    Image.new('RGB', (10, 10)).save(tmp_path / filename)
+    os.utime(tmp_path / filename, (0, 0))
+    IMAGE_CACHE.set((filename, '"etag"'), CachedImage(content=b'', media_type='image/png'))
+
+    assert await sweep_images() == [filename]
+    assert IMAGE_CACHE.get((filename, '"etag"')) is None
@@ -0,0 +1,64 @@
+import os
+from datetime import datetime, timedelta
+
+import pytest
+from rewire_sqlmodel import session_context, SQLModel, transaction
+from rewire_sqlmodel.tests import prefill_db
+from sqlalchemy.ext.asyncio import create_async_engine
+
+from src import models
+
+DATE_AFTER = datetime(2025, 1, 1)
+DATE_BEFORE = datetime(2025, 12, 31)
+CURSOR = (datetime(2025, 6, 1), 100)
+
+
+async def explain_query(connection, query) -> str:
+    compiled = query.compile(dialect=connection.dialect)
+    parameters = tuple(compiled.params[name] for name in compiled.positiontup or [])
+    prefix = 'EXPLAIN QUERY PLAN' if connection.dialect.name == 'sqlite' else 'EXPLAIN'
+
+    result = await connection.exec_driver_sql(f'{prefix} {compiled}', parameters)
+    return '\n'.join(str(row) for row in result.all())
+
+
+@transaction(1)
+async def explain_page_query(model) -> str:
+    for index in range(200):
+        model(created_at=DATE_AFTER + timedelta(hours=index)).add()
+
+    session = session_context.get()
+    await session.flush()
+
+    return await explain_query(await session.connection(), model.select_page(DATE_AFTER, DATE_BEFORE, CURSOR))
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize('model_name', ['Review', 'Complaint'])
+@prefill_db()
+async def test_page_query_uses_created_at_index_on_sqlite(model_name: str):
+    model = getattr(models, model_name)
+    query_plan = await explain_page_query(model)
+
+    assert f'ix_{model.__tablename__}_created_at_id' in query_plan
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize('model_name', ['Review', 'Complaint'])
+@pytest.mark.skipif(not os.environ.get('TEST_POSTGRES_URL'), reason='TEST_POSTGRES_URL is not set')
+@prefill_db()
+async def test_page_query_uses_created_at_index_on_postgres(model_name: str):
+    model = getattr(models, model_name)
+    engine = create_async_engine(os.environ['TEST_POSTGRES_URL'])
+
+    try:
+        async with engine.begin() as connection:
+            await connection.run_sync(SQLModel.metadata.create_all)
+            await connection.exec_driver_sql('SET LOCAL enable_seqscan = off')
+
+            query_plan = await explain_query(connection, model.select_page(DATE_AFTER, DATE_BEFORE, CURSOR))
+            await connection.rollback()
+    finally:
+        await engine.dispose()
+
+    assert f'ix_{model.__tablename__}_created_at_id' in query_plan
@@ -0,0 +1,36 @@
+import pytest
+from rewire_sqlmodel import transaction
+from rewire_sqlmodel.tests import prefill_db
+
+from src import outbox
+from src.models import Notification
+
+
+async def send_message(chat_id: int, message_text: str) -> bool:
+    return True
+
+
+async def raise_connection_error(chat_id: int, message_text: str) -> bool:
+    raise ConnectionError('MAX is unreachable')
+
+
+@transaction(1)
+async def load_notifications() -> dict:
+    return {notification.platform: notification for notification in await Notification.select().all()}
+
+
+@pytest.mark.asyncio
+@prefill_db(
+    Notification(id=1, platform='telegram', chat_id=1, message_text='Новый отзыв'),
+    Notification(id=2, platform='max', chat_id=2, message_text='Новый отзыв'),
+)
+async def test_failing_sender_does_not_block_other_notifications(monkeypatch):
+    monkeypatch.setitem(outbox.SENDERS, 'telegram', send_message)
+    monkeypatch.setitem(outbox.SENDERS, 'max', raise_connection_error)
+
+    assert await outbox.process_notifications()
+
+    notifications = await load_notifications()
+    assert notifications['telegram'].sent_at is not None
+    assert notifications['max'].sent_at is None
+    assert notifications['max'].next_attempt_at > notifications['max'].created_at